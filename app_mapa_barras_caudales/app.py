@@ -1,25 +1,38 @@
+import os
+import sys
+
 import dash
+import flask
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 import json
 
+from figure_cache import FigureCache
+from series import PiramideSerie
+
+# Capa de datos y métricas compartidas (geodatos.py y metricas.py en la raíz del repo)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from figuras import Esqueletos, forma, llenar
+import geodatos
+from configuracion import configurar_proceso, crear_app
+from metricas import fase, registro
+import plantillas
+
 
 # Datos
-df = pd.read_csv(r"data/geoquimica_limpio_index.csv")
-df['tamaño'] = 50
-
-lista_csv = [
-    'data/data_baroa.csv', 
-    'data/data_chilco.csv',
-    'data/data_cipres.csv', 
-    'data/data_cornou.csv',
-    'data/data_tumbes.csv', 
-    'data/data_vpinoh.csv',
-    'data/data_vsur.csv'
+tablas_caudales = [
+    'data_baroa',
+    'data_chilco',
+    'data_cipres',
+    'data_cornou',
+    'data_tumbes',
+    'data_vpinoh',
+    'data_vsur'
 ]
 
 nombres_caudales = [
@@ -32,166 +45,262 @@ nombres_caudales = [
     'Estrella Azul'
 ]
 
-dfs = [pd.read_csv(nombre) for nombre in lista_csv]
-dict_dfs = {nombre_hover: df for nombre_hover, df in zip(nombres_caudales, dfs)}
+
+def cargar_datos():
+    """Cargar las tablas de geoquímica y de caudales desde el bundle"""
+    df = geodatos.cargar('geoquimica')
+    df['tamaño'] = 50
+
+    dfs = [geodatos.cargar(tabla) for tabla in tablas_caudales]
+    dict_dfs = {nombre_hover: df for nombre_hover, df in zip(nombres_caudales, dfs)}
+
+    return df, dict_dfs
+
+
+def recargar_datos():
+    """Volver a leer los CSV cuando cambian en disco"""
+    global df, dict_dfs
+    df, dict_dfs = cargar_datos()
+
+
+df, dict_dfs = cargar_datos()
+
+# Cache de figuras de hover, se invalida si cambia algún CSV
+cache_figuras = FigureCache([geodatos.fuente(tabla) for tabla in ['geoquimica'] + tablas_caudales],
+                            on_change=recargar_datos)
+
+
+# Series de caudal a varias resoluciones, por vertiente; se rearman si
+# cambia la tabla (recargar_datos)
+_piramides = {}
+
+
+def piramide(nombre):
+    """Serie de caudal de una vertiente, con sus niveles de resolución"""
+    df_caudal = dict_dfs[nombre]
+    guardada = _piramides.get(nombre)
+    if guardada is None or guardada[0] is not df_caudal:
+        guardada = _piramides[nombre] = (df_caudal, PiramideSerie(df_caudal['Fecha'], df_caudal['C (L/min)']))
+    return guardada[1]
+
+
+def modo_caudales(nombre):
+    """Marcadores sólo si la serie entera cabe en el gráfico sin reducirla"""
+    serie = piramide(nombre)
+    return 'lines+markers' if len(serie) <= serie.puntos else 'lines'
+
+
+def rango_visible(relayoutData):
+    """
+    (x0, x1) del eje x en un relayoutData de zoom, (None, None) si se volvió
+    a la vista completa y None si el eje x no cambió
+    """
+    relayoutData = relayoutData or {}
+    if 'xaxis.range[0]' in relayoutData:
+        return relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]']
+    if 'xaxis.range' in relayoutData:
+        return tuple(relayoutData['xaxis.range'])
+    if relayoutData.get('xaxis.autorange'):
+        return None, None
+    return None
+
+
+def disparado_por(prop_id):
+    """True si ``prop_id`` disparó el callback en curso"""
+    return flask.has_request_context() and any(
+        disparo['prop_id'] == prop_id for disparo in dash.callback_context.triggered)
+
+
+def fechas(x):
+    """Fechas datetime64 como texto ISO, para el JSON de las figuras"""
+    return np.datetime_as_string(x, unit='s').tolist()
 
 
 # Templates para gráfico
 lista_templates = ['plotly', 'simple_white', 'plotly_dark', 'ggplot2']
 lista_basemaps = ['open-street-map', 'satellite', 'carto-darkmatter']
 
+# Dibujar los gráficos de hover en el navegador (assets/hover.js) en vez de
+# pedirlos al servidor en cada hover
+HOVER_CLIENTSIDE = os.environ.get('HOVER_CLIENTSIDE', '1') == '1'
+
 """############################################# Figuras preliminares ###############################################"""
 
-# Figura mapa
-latmax, latmin, lonmax, lonmin = df.N.max(), df.N.min(), df.E.max(), df.E.min()  # Limites mapa
-latavg, lonavg = (latmax + latmin) / 2, (lonmax + lonmin) / 2  # Centro mapa
-
-px.set_mapbox_access_token(open(".mapbox_token").read())
-
-# Mapa Geoquimica
-fig_mapa = px.scatter_mapbox(df, lat="N", lon="E",
-                             size='tamaño',
-                             size_max=7,
-                             hover_name="nombre",
-                             hover_data={'nombre': False, 'tamaño':False},
-                             custom_data=["codigo"],
-                             labels={'N': 'Lat', 'E': 'Lon'},
-                             center={'lat': latavg, 'lon': lonavg},
-                             mapbox_style='open-street-map',
-                             opacity=1,
-                             zoom=11)
-fig_mapa.update_layout(margin=dict(l=15, r=25, t=5, b=5))
-fig_mapa.layout.update(showlegend=False)
-
-# Mapa caudales
-df_xy = pd.read_csv('data/lonlat_caudales.csv')
+# Las figuras de los mapas se arman con el primer layout servido (o antes, en
+# segundo plano, ver el final del archivo) y no al importar la app
+
+px.set_mapbox_access_token(open(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mapbox_token")).read())
+
+df_xy = geodatos.cargar('lonlat_caudales')
 df_xy['tamaño'] = 50
-fig_mapa_2 = px.scatter_mapbox(df_xy, lat='lat', lon='lon',
-                               hover_name='Nombre',
-                               hover_data={'Nombre': False},
-                               size='tamaño',
-                               size_max=7,
-                               custom_data=[nombres_caudales],
-                               labels={'lat': 'Lat', 'lot': 'Lon'},
-                               center={'lat': latavg, 'lon': lonavg},
-                               opacity=1,
-                               zoom=11,
-                               mapbox_style='open-street-map')
-fig_mapa_2.update_traces(marker=dict(color='red'))
-fig_mapa_2.update_layout(margin=dict(l=15, r=25, t=5, b=5))
-fig_mapa_2.update_layout(showlegend=False)
+
+
+def centro_mapa():
+    """Centro de los mapas, a partir de los límites de las muestras"""
+    latmax, latmin, lonmax, lonmin = df.N.max(), df.N.min(), df.E.max(), df.E.min()  # Limites mapa
+    return (latmax + latmin) / 2, (lonmax + lonmin) / 2
+
+
+def figura_mapa():
+    """Mapa Geoquimica"""
+    latavg, lonavg = centro_mapa()
+    fig_mapa = px.scatter_mapbox(df, lat="N", lon="E",
+                                 size='tamaño',
+                                 size_max=7,
+                                 hover_name="nombre",
+                                 hover_data={'nombre': False, 'tamaño':False},
+                                 custom_data=["codigo"],
+                                 labels={'N': 'Lat', 'E': 'Lon'},
+                                 center={'lat': latavg, 'lon': lonavg},
+                                 mapbox_style='open-street-map',
+                                 opacity=1,
+                                 zoom=11)
+    fig_mapa.update_layout(margin=dict(l=15, r=25, t=5, b=5))
+    fig_mapa.layout.update(showlegend=False)
+    fig_mapa.update_layout(uirevision='mapa')  # Mantener zoom/pan al cambiar el basemap
+
+    return fig_mapa
+
+
+def figura_mapa_2():
+    """Mapa caudales"""
+    latavg, lonavg = centro_mapa()
+    fig_mapa_2 = px.scatter_mapbox(df_xy, lat='lat', lon='lon',
+                                   hover_name='Nombre',
+                                   hover_data={'Nombre': False},
+                                   size='tamaño',
+                                   size_max=7,
+                                   custom_data=[nombres_caudales],
+                                   labels={'lat': 'Lat', 'lot': 'Lon'},
+                                   center={'lat': latavg, 'lon': lonavg},
+                                   opacity=1,
+                                   zoom=11,
+                                   mapbox_style='open-street-map')
+    fig_mapa_2.update_traces(marker=dict(color='red'))
+    fig_mapa_2.update_layout(margin=dict(l=15, r=25, t=5, b=5))
+    fig_mapa_2.update_layout(showlegend=False)
+    fig_mapa_2.update_layout(uirevision='mapa_2')
+
+    return fig_mapa_2
 
 
 """################################################ Dash app ########################################################"""
 
 
 # Dash app
-app = dash.Dash(__name__)
+# Métricas y compresión comunes a las apps (configuracion.py)
+app = crear_app(__name__)
 server = app.server
 
+# Aciertos del cache de figuras en /metrics
+registro.cache('figuras', lambda: (cache_figuras.hits, cache_figuras.misses))
+
 """################################################ Layout ########################################################"""
 
-app.layout = html.Div([
+def contenido(fig_mapa=None, fig_mapa_2=None):
+    """
+    Contenido de la app, armado de nuevo en cada llamada con las figuras de
+    los mapas; sin ellas al validar el layout
+    """
+    return html.Div([
 
-    dcc.Tabs(id='tabs', children=[
+        dcc.Tabs(id='tabs', children=[
 
-        # Tab 1 (geoquimica)
-        dcc.Tab(id='tab_geoquimica',
-                label='Geoquímica',
-                children=[
-                    html.Div([
+            # Tab 1 (geoquimica)
+            dcc.Tab(id='tab_geoquimica',
+                    label='Geoquímica',
+                    children=[
                         html.Div([
-
-                            html.Div([dcc.RadioItems(id='radio-basemap',
-                                                     options=[{'label': basemap, 'value': basemap} for basemap in
-                                                              lista_basemaps],
-                                                     value='open-street-map')
-                                      ], style={'display': 'flex', 'justifyContent': 'center',
-                                                'marginTop': '5', 'marginBottom': '5'}),
-
-                            html.Div([dcc.Graph(id='mapa',
-                                                figure=fig_mapa,
-                                                hoverData={'points': [{'customdata': ['PT01']}]},
-                                                style={'width': '100%', 'height': '100%'}
-                                                )
-                                      ], style={'width': '100%', 'height': '89%'}),
-
-                                    ], style={'display': 'flex', 'flex-direction': 'column',
-                                              'position': 'relative', 'height': '100vh',
-                                              'width': '60%'}),
-
-                        html.Div([dcc.Graph(id='barras',
-                                            hoverData={'points': [{'customdata': ['Baroa Bajo']}]}),
-                                  html.H3('Estilo de gráfico'),
-                                  dcc.Dropdown(id='dropdown-estilos',
-                                               options=[{'label': estilo, 'value': estilo} for estilo in
-                                                        lista_templates],
-                                               value='plotly')], style={'width': '40%'})
+                            html.Div([
+
+                                html.Div([dcc.RadioItems(id='radio-basemap',
+                                                         options=[{'label': basemap, 'value': basemap} for basemap in
+                                                                  lista_basemaps],
+                                                         value='open-street-map')
+                                          ], style={'display': 'flex', 'justifyContent': 'center',
+                                                    'marginTop': '5', 'marginBottom': '5'}),
+
+                                html.Div([dcc.Graph(id='mapa',
+                                                    figure=fig_mapa or {},
+                                                    hoverData={'points': [{'customdata': ['PT01']}]},
+                                                    style={'width': '100%', 'height': '100%'}
+                                                    )
+                                          ], style={'width': '100%', 'height': '89%'}),
+
+                                        ], style={'display': 'flex', 'flex-direction': 'column',
+                                                  'position': 'relative', 'height': '100vh',
+                                                  'width': '60%'}),
+
+                            html.Div([dcc.Graph(id='barras',
+                                                hoverData={'points': [{'customdata': ['Baroa Bajo']}]}),
+                                      html.H3('Estilo de gráfico'),
+                                      dcc.Dropdown(id='dropdown-estilos',
+                                                   options=[{'label': estilo, 'value': estilo} for estilo in
+                                                            lista_templates],
+                                                   value='plotly')], style={'width': '40%'})
+
+                                    ], style={'display': 'flex', 'alignItems': 'center'})
+                    ]),
+
+            # Tab 2 (caudales)
+            dcc.Tab(id='tab_caudales',
+                    label='Caudales',
+                    children=[
+                        html.Div([
+                html.Div([
+
+                    html.Div([dcc.RadioItems(id='radio-basemap_2',
+                                             options=[{'label': basemap, 'value': basemap} for basemap in lista_basemaps],
+                                             value='open-street-map')
+                              ], style={'display': 'flex', 'justifyContent': 'center',
+                                                    'marginTop': '5', 'marginBottom': '5'}),
+
+                    html.Div([dcc.Graph(id='mapa_2',
+                                        figure=fig_mapa_2 or {},
+                                        hoverData={'points': [{'customdata': ['Baroa Bajo']}]},
+                                        style={'width': '100%', 'height': '100%'}
+                                        )
+                              ], style={'width': '100%', 'height': '89%'}),
+
+
+                            ], style={'display': 'flex', 'flex-direction': 'column',
+                                      'position': 'relative', 'height': '100vh',
+                                      'width': '60%'}),
+
+                html.Div([dcc.Graph(id='lines-caudal',
+                                    hoverData={'points': [{'customdata': ['Baroa Bajo']}]}),
+                          # Tramo visible del gráfico a más resolución, al hacer zoom
+                          dcc.Store(id='zoom-caudal'),
+                          html.H3('Estilo de gráfico'),
+                          dcc.Dropdown(id='dropdown-estilos_2',
+                                       options=[{'label': estilo, 'value': estilo} for estilo in lista_templates],
+                                       value='plotly')], style={'width': '40%'})
 
                                 ], style={'display': 'flex', 'alignItems': 'center'})
-                ]),
-
-        # Tab 2 (caudales)
-        dcc.Tab(id='tab_caudales',
-                label='Caudales',
-                children=[
-                    html.Div([
-            html.Div([
-
-                html.Div([dcc.RadioItems(id='radio-basemap_2',
-                                         options=[{'label': basemap, 'value': basemap} for basemap in lista_basemaps],
-                                         value='open-street-map')
-                          ], style={'display': 'flex', 'justifyContent': 'center',
-                                                'marginTop': '5', 'marginBottom': '5'}),
-
-                html.Div([dcc.Graph(id='mapa_2',
-                                    figure=fig_mapa_2,
-                                    hoverData={'points': [{'customdata': ['Baroa Bajo']}]},
-                                    style={'width': '100%', 'height': '100%'}
-                                    )
-                          ], style={'width': '100%', 'height': '89%'}),
-
-
-                        ], style={'display': 'flex', 'flex-direction': 'column',
-                                  'position': 'relative', 'height': '100vh',
-                                  'width': '60%'}),
+                            ])
+                ])
 
-            html.Div([dcc.Graph(id='lines-caudal',
-                                hoverData={'points': [{'customdata': ['Baroa Bajo']}]}),
-                      html.H3('Estilo de gráfico'),
-                      dcc.Dropdown(id='dropdown-estilos_2',
-                                   options=[{'label': estilo, 'value': estilo} for estilo in lista_templates],
-                                   value='plotly')], style={'width': '40%'})
-
-                            ], style={'display': 'flex', 'alignItems': 'center'})
-                        ])
-            ])
-
-                    ], style={'margin': 0, 'fontFamily': 'Lucida Sans'})
+                        ], style={'margin': 0, 'fontFamily': 'Lucida Sans'})
 
 
 """############################################### Callbacks ########################################################"""
 
 
-# Actualizar basemap en mapa
-@app.callback([Output('mapa', 'figure'),
-              Output('mapa_2', 'figure')],
-              [Input('radio-basemap', 'value'),
-               Input('radio-basemap_2', 'value')])
-def update_basemap(basemap, basemap2):
-    fig_mapa.update_layout(mapbox_style=basemap)
-    fig_mapa_2.update_layout(mapbox_style=basemap2)
+# Actualizar basemap en mapa: cada radio cambia sólo el estilo de su mapa,
+# en el navegador (assets/basemap.js)
+app.clientside_callback(ClientsideFunction(namespace='mapas', function_name='basemap'),
+                        Output('mapa', 'figure'),
+                        [Input('radio-basemap', 'value')],
+                        [State('mapa', 'figure')])
 
-    return fig_mapa, fig_mapa_2
+app.clientside_callback(ClientsideFunction(namespace='mapas', function_name='basemap'),
+                        Output('mapa_2', 'figure'),
+                        [Input('radio-basemap_2', 'value')],
+                        [State('mapa_2', 'figure')])
 
 
-# Actualizar figura barras
-@app.callback(Output('barras', 'figure'),
-              [Input('mapa', 'hoverData'),
-               Input('dropdown-estilos', 'value')])
-def update_barras(hoverData, estilo):
-    """Recargar gráfico de barra en base a atributo de hover"""
-    cod_muestra = hoverData['points'][0]['customdata'][0]# Codigo de muestra en hover
+def figura_barras_px(cod_muestra, estilo):
+    """Gráfico de barras de elementos mayores de una muestra, con Plotly Express"""
     filt = df.codigo == cod_muestra
     df_x_muestra = df.loc[filt]
     lista_valores = pd.Series(df_x_muestra.iloc[0, 4:-1])
@@ -207,24 +316,180 @@ def update_barras(hoverData, estilo):
     return fig_barras
 
 
-# Serie de tiempo de caudales
-@app.callback(Output('lines-caudal', 'figure'),
-              [Input('mapa_2', 'hoverData'),
-               Input('dropdown-estilos_2', 'value')])
-def update_caudales(hoverData, estilo):
-    """Recargar gráfico de caudales en base a hover"""
-    nombre = hoverData['points'][0]['customdata'][0] # Nombre de df en hover
-    fig_caudales = px.line(dict_dfs[nombre],
+def figura_caudales_px(nombre, estilo):
+    """
+    Serie de tiempo de caudales de una vertiente, reducida a la vista
+    completa, con Plotly Express
+    """
+    x, y = piramide(nombre).rango()
+    fig_caudales = px.line(pd.DataFrame({'Fecha': x, 'C (L/min)': y}),
                            x='Fecha',
                            y='C (L/min)',
                            title=nombre,
                            template=estilo)
-    fig_caudales.update_traces(mode='lines+markers')
-    fig_caudales.update_layout(title_x=.5, title_font_size=20)
+    fig_caudales.update_traces(mode=modo_caudales(nombre))
+    # uirevision por vertiente: el zoom se mantiene al cambiar los datos
+    # del tramo visible o el estilo, y se reinicia al cambiar de vertiente
+    fig_caudales.update_layout(title_x=.5, title_font_size=20, uirevision=nombre)
     fig_caudales.update_xaxes(tickformat="%d/%m/%y")
 
     return fig_caudales
 
 
+# Esqueletos de los gráficos de hover, uno por estilo (figuras.py): px arma
+# cada uno una vez y cada figura sólo pone sus datos y su título
+esqueletos_barras = Esqueletos(figura_barras_px)
+esqueletos_caudales = Esqueletos(figura_caudales_px)
+
+
+def figura_barras(cod_muestra, estilo):
+    """Gráfico de barras de elementos mayores de una muestra, igual al de figura_barras_px"""
+    esqueleto = esqueletos_barras.get(estilo, cod_muestra, estilo)
+    valores = df.iloc[:, 4:-1].to_numpy()[(df.codigo == cod_muestra).to_numpy()][0]
+    return llenar(esqueleto, [{'y': valores}], titulo=cod_muestra)
+
+
+def figura_caudales(nombre, estilo):
+    """Serie de caudales de una vertiente, igual a la de figura_caudales_px"""
+    x, y = piramide(nombre).rango()
+    esqueleto = esqueletos_caudales.get((estilo, forma(len(x))), nombre, estilo)
+    return llenar(esqueleto, [{'x': fechas(x), 'y': y, 'mode': modo_caudales(nombre)}],
+                  titulo=nombre, layout={'uirevision': nombre})
+
+
+def sin_datos(figura):
+    """Figura con la traza vacía, como plantilla para el navegador"""
+    return dict(figura, data=[dict(figura['data'][0], x=[], y=[])])
+
+
+def datos_hover():
+    """
+    Datos columnares de los gráficos de hover para el dcc.Store: una figura
+    plantilla por estilo, las concentraciones por muestra y las series de
+    caudal por vertiente.
+    """
+    codigos = df.codigo.tolist()
+    return {
+        'barras': {
+            'plantillas': {estilo: cache_figuras.get(figura_barras, codigos[0], estilo)
+                           for estilo in lista_templates},
+            'codigos': codigos,
+            'valores': df.iloc[:, 4:-1].values.tolist()
+        },
+        'caudales': {
+            # Sin x/y: el navegador pone los de la vertiente
+            'plantillas': {estilo: sin_datos(cache_figuras.get(figura_caudales, nombres_caudales[0], estilo))
+                           for estilo in lista_templates},
+            'series': {nombre: [fechas(x), y.tolist()]
+                       for nombre, (x, y) in ((nombre, piramide(nombre).rango()) for nombre in dict_dfs)},
+            'modos': {nombre: modo_caudales(nombre) for nombre in dict_dfs}
+        }
+    }
+
+
+def serve_layout():
+    """Layout por sesión, con los datos de hover vigentes para el navegador"""
+    if not flask.has_request_context():
+        # Dash valida el layout al asignarlo: no se arman figuras al importar
+        return contenido()
+
+    # Cada request arma sus componentes: el árbol no se comparte entre sesiones
+    layout = contenido(cache_figuras.get(figura_mapa), cache_figuras.get(figura_mapa_2))
+    if not HOVER_CLIENTSIDE:
+        return layout
+    return html.Div([layout, dcc.Store(id='datos-hover', data=datos_hover())])
+
+
+app.layout = serve_layout
+
+
+# Actualizar figura barras
+def update_barras(hoverData, estilo):
+    """Recargar gráfico de barra en base a atributo de hover"""
+    cod_muestra = hoverData['points'][0]['customdata'][0]# Codigo de muestra en hover
+
+    with fase('figura'):
+        return cache_figuras.get(figura_barras, cod_muestra, estilo)
+
+
+# Serie de tiempo de caudales
+def update_caudales(hoverData, estilo, relayoutData=None):
+    """Recargar gráfico de caudales en base a hover y al zoom del gráfico"""
+    nombre = hoverData['points'][0]['customdata'][0] # Nombre de df en hover
+
+    with fase('figura'):
+        figura = cache_figuras.get(figura_caudales, nombre, estilo)
+
+    if not relayoutData:
+        return figura
+
+    # Al cambiar de vertiente o de estilo se vuelve a la vista completa
+    por_zoom = disparado_por('lines-caudal.relayoutData')
+    rango = rango_visible(relayoutData) if por_zoom or not flask.has_request_context() else None
+    if rango is None:
+        if por_zoom:
+            raise dash.exceptions.PreventUpdate
+        return figura
+
+    with fase('datos'):
+        x, y = piramide(nombre).rango(*rango)
+    return dict(figura, data=[dict(figura['data'][0], x=fechas(x), y=y.tolist())])
+
+
+def zoom_caudales(relayoutData, hoverData):
+    """Tramo visible de la serie a la resolución que le corresponde"""
+    if disparado_por('mapa_2.hoverData'):
+        # Otra vertiente: vuelve a la vista completa
+        return None
+    rango = rango_visible(relayoutData)
+    if rango is None:
+        raise dash.exceptions.PreventUpdate
+
+    nombre = hoverData['points'][0]['customdata'][0]
+    with fase('datos'):
+        x, y = piramide(nombre).rango(*rango)
+    return {'nombre': nombre, 'x': fechas(x), 'y': y.tolist()}
+
+
+if HOVER_CLIENTSIDE:
+    app.clientside_callback(ClientsideFunction(namespace='hover', function_name='barras'),
+                            Output('barras', 'figure'),
+                            [Input('mapa', 'hoverData'),
+                             Input('dropdown-estilos', 'value')],
+                            [State('datos-hover', 'data')])
+
+    app.clientside_callback(ClientsideFunction(namespace='hover', function_name='caudales'),
+                            Output('lines-caudal', 'figure'),
+                            [Input('mapa_2', 'hoverData'),
+                             Input('dropdown-estilos_2', 'value'),
+                             Input('zoom-caudal', 'data')],
+                            [State('datos-hover', 'data')])
+
+    # El zoom sí pasa por el servidor, que tiene la serie completa
+    app.callback(Output('zoom-caudal', 'data'),
+                 [Input('lines-caudal', 'relayoutData'),
+                  Input('mapa_2', 'hoverData')])(zoom_caudales)
+else:
+    # Respaldo: los mismos gráficos armados en el servidor
+    app.callback(Output('barras', 'figure'),
+                 [Input('mapa', 'hoverData'),
+                  Input('dropdown-estilos', 'value')])(update_barras)
+
+    app.callback(Output('lines-caudal', 'figure'),
+                 [Input('mapa_2', 'hoverData'),
+                  Input('dropdown-estilos_2', 'value'),
+                  Input('lines-caudal', 'relayoutData')])(update_caudales)
+
+
+# Construir en segundo plano los mapas y todas las figuras de hover
+plantillas.precargar(*lista_templates)
+cache_figuras.warm_async(
+    (figura_mapa, [()]),
+    (figura_mapa_2, [()]),
+    (figura_barras, [(codigo, estilo) for codigo in df.codigo for estilo in lista_templates]),
+    (figura_caudales, [(nombre, estilo) for nombre in nombres_caudales for estilo in lista_templates]))
+
+
 if __name__ == '__main__':
+    configurar_proceso()
     app.run_server(debug=False)
\ No newline at end of file
@@ -0,0 +1,16 @@
+// Cambio de basemap en el navegador: se copia la figura actual del mapa
+// cambiando sólo layout.mapbox.style, sin pasar por el servidor.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+	mapas: {
+		basemap: function(basemap, figura) {
+			if (!basemap || !figura) {
+				return window.dash_clientside.no_update;
+			}
+			const mapbox = Object.assign({}, figura.layout.mapbox, {style: basemap});
+			return Object.assign({}, figura, {
+				layout: Object.assign({}, figura.layout, {mapbox: mapbox})
+			});
+		}
+	}
+});
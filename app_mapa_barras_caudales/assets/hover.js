@@ -0,0 +1,47 @@
+// Gráficos de hover dibujados en el navegador a partir del dcc.Store
+// 'datos-hover'. Cada plantilla es la figura que arma el servidor para un
+// estilo; aquí sólo se reemplazan los datos de la traza y el título.
+// uirevision sigue al título: el zoom se mantiene mientras no cambie la
+// muestra o la vertiente.
+
+function figuraConDatos(plantilla, titulo, datos) {
+	const traza = Object.assign({}, plantilla.data[0], datos);
+	const title = Object.assign({}, plantilla.layout.title, {text: titulo});
+	return {
+		data: [traza],
+		layout: Object.assign({}, plantilla.layout, {title: title, uirevision: titulo})
+	};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+	hover: {
+		barras: function(hoverData, estilo, datos) {
+			if (!hoverData || !datos) {
+				return window.dash_clientside.no_update;
+			}
+			const codigo = hoverData.points[0].customdata[0];
+			const barras = datos.barras;
+			const fila = barras.codigos.indexOf(codigo);
+			if (fila < 0) {
+				return window.dash_clientside.no_update;
+			}
+			return figuraConDatos(barras.plantillas[estilo], codigo, {y: barras.valores[fila]});
+		},
+
+		caudales: function(hoverData, estilo, zoom, datos) {
+			if (!hoverData || !datos) {
+				return window.dash_clientside.no_update;
+			}
+			const nombre = hoverData.points[0].customdata[0];
+			const serie = datos.caudales.series[nombre];
+			if (!serie) {
+				return window.dash_clientside.no_update;
+			}
+			// El store trae la serie reducida a la vista completa; con zoom,
+			// el servidor manda el tramo visible a más resolución
+			const tramo = zoom && zoom.nombre === nombre ? [zoom.x, zoom.y] : serie;
+			return figuraConDatos(datos.caudales.plantillas[estilo], nombre,
+				{x: tramo[0], y: tramo[1], mode: datos.caudales.modos[nombre]});
+		}
+	}
+});
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+class FigureCache:
+    """
+    LRU cache of figures already serialized to JSON-ready dicts.
+
+    Figures are keyed by the builder function and its arguments, e.g.
+    ``cache.get(figura_barras, 'PT01', 'plotly')``, so the Plotly Express
+    construction and validation run once per distinct input. The whole
+    cache is dropped when any of the ``sources`` files changes on disk.
+
+    sources: list of str
+        Files the figures are built from (the CSVs).
+    on_change: callable
+        Called without arguments after a source changed and before the next
+        figure is built, typically to reload the data.
+    check_interval: float
+        Minimum seconds between two mtime checks of the sources.
+    """
+
+    def __init__(self, sources, maxsize=256, on_change=None, check_interval=2.0):
+        self.sources = list(sources)
+        self.maxsize = maxsize
+        self.on_change = on_change
+        self.check_interval = check_interval
+
+        self._figures = OrderedDict()
+        self._lock = threading.RLock()
+        # Cambia con cada vaciado; una figura armada antes no se guarda
+        self._generation = 0
+        self._mtimes = self._read_mtimes()
+        self._checked = time.monotonic()
+        self.hits = self.misses = 0
+
+    def _read_mtimes(self):
+        return [os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in self.sources]
+
+    def _check_sources(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+
+        mtimes = self._read_mtimes()
+        if mtimes != self._mtimes:
+            self._mtimes = mtimes
+            self._clear()
+            if self.on_change is not None:
+                self.on_change()
+
+    def get(self, build, *args):
+        """Figure dict for ``build(*args)``, built only on a miss."""
+        key = (build.__name__,) + args
+        with self._lock:
+            self._check_sources()
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+            generation = self._generation
+
+        # Se serializa una sola vez; Dash sólo re-codifica un dict plano
+        figure = json.loads(json.dumps(build(*args), cls=PlotlyJSONEncoder))
+
+        with self._lock:
+            if generation != self._generation:
+                # El cache se vació mientras se armaba: puede venir de datos viejos
+                return figure
+            self._figures[key] = figure
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def warm(self, build, args_list):
+        """Build every ``args`` in ``args_list`` ahead of the first hover."""
+        for args in args_list:
+            self.get(build, *args)
+
+    def warm_async(self, *jobs):
+        """Run ``warm`` for each (build, args_list) pair in a daemon thread."""
+        def run():
+            for build, args_list in jobs:
+                self.warm(build, args_list)
+
+        thread = threading.Thread(target=run, name='warm-figures', daemon=True)
+        thread.start()
+        return thread
+
+    def _clear(self):
+        self._figures.clear()
+        self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
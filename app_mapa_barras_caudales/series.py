@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Puntos por gráfico: unos dos por columna de pixeles de la pantalla
+PUNTOS = 2000
+
+# Reducción de cada nivel de la pirámide respecto al anterior
+FACTOR = 4
+
+
+def lttb(x, y, n):
+    """
+    Indices of the ``n`` points that Largest-Triangle-Three-Buckets keeps
+    of the series (x, y), x increasing. The first and last points are
+    always kept.
+    """
+    largo = len(x)
+    if n >= largo or n < 3:
+        return np.arange(largo)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # n - 2 buckets entre el primer y el último punto, y su centroide
+    bordes = np.linspace(1, largo - 1, n - 1).astype('int64')
+    suma_x, suma_y = np.concatenate([[0], np.cumsum(x)]), np.concatenate([[0], np.cumsum(y)])
+    tamaños = np.diff(bordes)
+    medias_x = np.append((suma_x[bordes[1:]] - suma_x[bordes[:-1]]) / tamaños, x[-1])
+    medias_y = np.append((suma_y[bordes[1:]] - suma_y[bordes[:-1]]) / tamaños, y[-1])
+
+    indices = np.empty(n, dtype='int64')
+    indices[0], indices[-1] = 0, largo - 1
+    a = 0
+    for i in range(n - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Punto del bucket que forma el triángulo más grande con el punto
+        # elegido en el anterior y el centroide del siguiente
+        area = np.abs((x[a] - medias_x[i + 1]) * (y[inicio:fin] - y[a])
+                      - (x[a] - x[inicio:fin]) * (medias_y[i + 1] - y[a]))
+        a = inicio + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(y, n):
+    """
+    Indices of the minimum and maximum of each of ``n / 2`` equal buckets
+    of ``y``, plus the first and last points. Keeps every peak and is
+    vectorized, unlike ``lttb``, so it builds the large levels.
+    """
+    largo = len(y)
+    if n >= largo:
+        return np.arange(largo)
+    tamaño = -(-2 * largo // n)
+    buckets = -(-largo // tamaño)
+
+    relleno = np.full(buckets * tamaño, np.nan)
+    relleno[:largo] = y
+    relleno = relleno.reshape(buckets, tamaño)
+    base = np.arange(buckets) * tamaño
+    indices = np.concatenate([[0, largo - 1],
+                              base + np.nanargmin(relleno, axis=1),
+                              base + np.nanargmax(relleno, axis=1)])
+    return np.unique(indices)
+
+
+class PiramideSerie:
+    """
+    Time series precomputed at decreasing resolutions, to plot any range of
+    it with about ``puntos`` points.
+
+    Level 0 is the series itself and each level keeps the min/max per
+    bucket of the previous one, ``FACTOR`` times fewer points, down to the
+    overview: ``puntos`` points chosen with LTTB, which follows the shape
+    of the line better once it is that coarse. ``rango`` answers a
+    visible range from the finest level that fits in ``puntos`` with two
+    binary searches, without downsampling anything per request.
+
+    x: array-like of datetimes or numbers
+        Increasing.
+    y: array-like of float
+        Points with NaN are dropped.
+    """
+
+    def __init__(self, x, y, puntos=PUNTOS, factor=FACTOR):
+        x = np.asarray(x)
+        y = np.asarray(y, dtype='float64')
+        validos = ~np.isnan(y)
+        x, y = x[validos], y[validos]
+
+        self.puntos = puntos
+        self.fechas = x.dtype.kind == 'M'
+        claves = x.astype('datetime64[ns]').view('int64') if self.fechas else x.astype('float64')
+
+        self.niveles = [(claves, y)]
+        while len(claves) > puntos:
+            if len(claves) // factor > puntos:
+                indices = minmax(y, len(claves) // factor)
+            else:
+                indices = lttb(claves, y, puntos)
+            claves, y = claves[indices], y[indices]
+            self.niveles.append((claves, y))
+
+    def __len__(self):
+        return len(self.niveles[0][0])
+
+    def _clave(self, valor):
+        if self.fechas:
+            return pd.Timestamp(valor).value
+        return float(valor)
+
+    def rango(self, x0=None, x1=None):
+        """
+        Points of the range [x0, x1] (the whole series if None) from the
+        finest level that has at most ``puntos`` points in it, plus the
+        neighbor on each side so the line reaches the plot edges.
+
+        Returns
+        -------
+        Tuple (x, y) of arrays, x as datetime64[ns] for date series
+        """
+        for claves, y in self.niveles:
+            inicio = 0 if x0 is None else max(np.searchsorted(claves, self._clave(x0), 'left') - 1, 0)
+            fin = len(claves) if x1 is None else np.searchsorted(claves, self._clave(x1), 'right') + 1
+            if fin - inicio <= self.puntos:
+                break
+        x = claves[inicio:fin]
+        return (x.view('datetime64[ns]') if self.fechas else x), y[inicio:fin]
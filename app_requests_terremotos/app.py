@@ -1,25 +1,39 @@
+import os
+import sys
+import threading
 from functools import partial
 
 import pandas as pd
 
-import dash
 import dash_table
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
 
-import plotly.express as px
+# Módulos compartidos (metricas.py en la raíz del repo)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from configuracion import configurar_proceso, crear_app
+from metricas import fase
+import plantillas
 
-from utilities import get_earthquake_df, plot_map, plot_table
+from utilities import get_earthquake_df, plot_map, plot_table, table_page, scheduler
 
-df = get_earthquake_df()[0]
+scheduler.start()
 
-fig = plot_map(df)
+# Sin esperar a la USGS: antes del primer sync la tabla parte vacía y el
+# mapa lo llenan los callbacks al cargar la página
+df = get_earthquake_df(bloquear=False)[0]
 
 tabla = plot_table(df)
 
+# Importa Plotly Express y arma un mapa descartable en segundo plano, para
+# que el primer callback no pague ese costo
+plantillas.precargar()
+threading.Thread(target=plot_map, args=(df,), name='warm-plot-map', daemon=True).start()
 
-app = dash.Dash(__name__)
+
+# Métricas y compresión comunes a las apps (configuracion.py)
+app = crear_app(__name__)
 
 app.layout = html.Div(children=[
 	html.Div([tabla], id='tabla', className='tabla-dash'),
@@ -52,27 +66,44 @@ app.layout = html.Div(children=[
 			    	)
 			    ], className='dropdown-item')
 			], className='div-dropdowns'),
-		dcc.Graph(id='mapa', figure=fig, style={'margin': '0', 'height':'100%'})
+		dcc.Graph(id='mapa', style={'margin': '0', 'height':'100%'})
 	], className="div-contenido", id="div-contenido"),
 ], style={'height': '85vh', 'display': 'flex'})
 
 
 @app.callback(
-    [Output(component_id='mapa', component_property='figure'),
-    Output(component_id='tabla', component_property='children')],
+    Output(component_id='mapa', component_property='figure'),
     [Input(component_id='dropdown-mag', component_property='value'),
-    Input(component_id='dropdown-tiempo', component_property='value')]
+    Input(component_id='dropdown-tiempo', component_property='value'),
+    Input(component_id='mapa', component_property='relayoutData')]
 )
-def update_map_mag(mag, t):
+def update_map_mag(mag, t, relayoutData):
 
 	mag = float(mag)
 
-	df = get_earthquake_df(magnitud=mag, intervalo=t)[0]
+	with fase('datos'):
+		df = get_earthquake_df(magnitud=mag, intervalo=t)[0]
+
+	fig = plot_map(df, relayoutData)
+
+	return fig
+
+@app.callback(
+    [Output(component_id='dash-table', component_property='data'),
+    Output(component_id='dash-table', component_property='page_count')],
+    [Input(component_id='dropdown-mag', component_property='value'),
+    Input(component_id='dropdown-tiempo', component_property='value'),
+    Input(component_id='dash-table', component_property='page_current'),
+    Input(component_id='dash-table', component_property='page_size'),
+    Input(component_id='dash-table', component_property='sort_by'),
+    Input(component_id='dash-table', component_property='filter_query')]
+)
+def update_tabla(mag, t, page_current, page_size, sort_by, filter_query):
 
-	fig = plot_map(df)
-	tabla = plot_table(df)
+	with fase('datos'):
+		df = get_earthquake_df(magnitud=float(mag), intervalo=t)[0]
 
-	return fig, tabla
+		return table_page(df, page_current, page_size, sort_by, filter_query)
 
 @app.callback(
     [Output(component_id='tabla', component_property='style'),
@@ -87,4 +118,5 @@ def hide_table(n_clicks):
 			return {"width": "0"}, {"width": "100vw"}
 
 if __name__ == '__main__':
+    configurar_proceso()
     app.run_server(debug=False, use_reloader=True)
\ No newline at end of file
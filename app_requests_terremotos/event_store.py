@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from geojson_parser import COLUMNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id    TEXT PRIMARY KEY,
+    mag   REAL,
+    place TEXT,
+    time  INTEGER NOT NULL,
+    tz    REAL,
+    type  TEXT,
+    title TEXT,
+    lon   REAL,
+    lat   REAL,
+    depth REAL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_mag_time ON events (mag, time);
+CREATE INDEX IF NOT EXISTS events_lat_lon ON events (lat, lon);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_FIELDS = ('id', 'mag', 'place', 'time', 'tz', 'type', 'title', 'lon', 'lat', 'depth')
+
+
+def _to_ms(value):
+    """Epoch milliseconds from seconds (int/float) or anything pandas parses."""
+    if isinstance(value, (int, float)):
+        return int(value * 1000)
+    return int(pd.Timestamp(value).value // 10**6)
+
+
+def _none_if_nan(value):
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+class EventStore:
+    """
+    Persistent SQLite store of USGS events keyed by event ``id``.
+
+    Feed snapshots are merged with ``merge``: new ids are inserted, known
+    ids are updated with the revised values and stored events that fall in
+    the window the snapshot covers but are missing from it are deleted.
+    Time, magnitude and lat/lon are indexed so ``query`` can answer any
+    combination, including ranges older than the 30 days of the feeds.
+
+    path: str
+        SQLite file, or ":memory:".
+    """
+
+    def __init__(self, path=':memory:'):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # Los workers de gunicorn comparten el archivo: con WAL las
+            # consultas de uno no esperan al merge de otro
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def merge(self, df, start, end, min_mag=None, synced_at=None, snapshot=None):
+        """
+        Merge a feed snapshot into the store.
+
+        df: DataFrame
+            Events as returned by ``geojson_parser.parse_feed``.
+        start, end: float (epoch seconds) or datetime-like
+            Time window fully covered by the snapshot. Only events inside it
+            (and with ``mag >= min_mag``) can be deleted.
+        synced_at: float
+            Epoch seconds recorded as the last successful sync.
+        snapshot: str
+            Identifier of the snapshot. A snapshot already merged, by this
+            or another process sharing the file, is skipped.
+
+        Returns
+        -------
+        dict with the number of inserted, updated and deleted events
+        """
+        rows = [tuple(_none_if_nan(v) for v in row)
+                for row in zip(df['id'], df['mag'], df['place'],
+                               df['time'].values.astype('datetime64[ms]').astype('int64').tolist(),
+                               df['tz'], df['type'], df['title'], df['lon'], df['lat'], df['depth'])]
+        placeholders = ', '.join('?' * len(_FIELDS))
+
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            # El lock de escritura se toma al principio: si dos workers leen
+            # y después intentan escribir, SQLite aborta uno sin esperar
+            cur.execute("BEGIN IMMEDIATE")
+            if snapshot is not None:
+                row = cur.execute("SELECT value FROM meta WHERE key = 'snapshot'").fetchone()
+                if row is not None and row[0] == snapshot:
+                    return {'inserted': 0, 'updated': 0, 'deleted': 0}
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS snapshot AS SELECT * FROM events WHERE 0")
+            cur.execute("DELETE FROM snapshot")
+            cur.executemany(f"INSERT INTO snapshot ({', '.join(_FIELDS)}) VALUES ({placeholders})", rows)
+
+            inserted = cur.execute(
+                "SELECT COUNT(*) FROM snapshot s WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.id = s.id)"
+            ).fetchone()[0]
+            updated = cur.execute(
+                "SELECT COUNT(*) FROM snapshot s JOIN events e ON e.id = s.id WHERE "
+                + ' OR '.join(f"e.{f} IS NOT s.{f}" for f in _FIELDS[1:])
+            ).fetchone()[0]
+
+            cur.execute(
+                f"INSERT INTO events ({', '.join(_FIELDS)}) SELECT {', '.join(_FIELDS)} FROM snapshot WHERE 1 "
+                "ON CONFLICT(id) DO UPDATE SET "
+                + ', '.join(f"{f} = excluded.{f}" for f in _FIELDS[1:])
+            )
+
+            sql = ("DELETE FROM events WHERE time >= ? AND time <= ? "
+                   "AND id NOT IN (SELECT id FROM snapshot)")
+            params = [_to_ms(start), _to_ms(end)]
+            if min_mag is not None:
+                sql += " AND mag >= ?"
+                params.append(min_mag)
+            deleted = cur.execute(sql, params).rowcount
+
+            if synced_at is not None:
+                cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_sync', ?)", (repr(synced_at),))
+            if snapshot is not None:
+                cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('snapshot', ?)", (snapshot,))
+
+        return {'inserted': inserted, 'updated': updated, 'deleted': deleted}
+
+    def last_sync(self):
+        """Epoch seconds of the last merge that recorded ``synced_at``, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_sync'").fetchone()
+        return float(row[0]) if row else None
+
+    def query(self, min_mag=None, start=None, end=None, bbox=None):
+        """
+        min_mag: float
+            Minimum magnitude, inclusive.
+        start, end: float (epoch seconds) or datetime-like
+            Time range, inclusive.
+        bbox: tuple
+            (lon_min, lat_min, lon_max, lat_max).
+
+        Returns
+        -------
+        pandas DataFrame with the columns of ``geojson_parser.COLUMNS``,
+        newest events first like the USGS feeds
+        """
+        where, params = [], []
+        if min_mag is not None:
+            where.append("mag >= ?")
+            params.append(min_mag)
+        if start is not None:
+            where.append("time >= ?")
+            params.append(_to_ms(start))
+        if end is not None:
+            where.append("time <= ?")
+            params.append(_to_ms(end))
+        if bbox is not None:
+            lon_min, lat_min, lon_max, lat_max = bbox
+            where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+            params.extend([lat_min, lat_max, lon_min, lon_max])
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + ' AND '.join(where)
+        sql += " ORDER BY time DESC"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        df = pd.DataFrame.from_records(rows, columns=COLUMNS)
+        df['time'] = pd.to_datetime(df['time'].astype('int64'), unit='ms', origin='unix')
+        for col in ('mag', 'tz', 'lon', 'lat', 'depth'):
+            df[col] = df[col].astype('float64')
+        return df
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
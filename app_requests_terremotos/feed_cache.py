@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from shared_store import SharedEntry
+
+logger = logging.getLogger(__name__)
+
+# Se puede apuntar a un servidor local (benchmarks, pruebas)
+USGS_FEED_URL = os.environ.get('USGS_FEED_URL', "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary")
+
+# Cadencia de actualización de cada feed en la USGS (segundos)
+FEED_TTL = {'hour': 60, 'day': 60, 'week': 60, 'month': 900}
+
+# (connect, read) timeouts para no bloquear un callback indefinidamente
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# fetched: epoch de la descarga, comparable entre procesos
+_Entry = namedtuple('_Entry', ['value', 'fetched', 'etag', 'last_modified'])
+
+
+class FeedCache:
+    """
+    Per-(magnitud, intervalo) cache of the USGS summary feeds.
+
+    Entries live for the TTL of their feed. Expired entries are served
+    stale while a background thread revalidates them with a conditional
+    GET (ETag / If-Modified-Since), so only the very first request for a
+    feed waits on the network.
+
+    parse: callable
+        Receives the raw response body (bytes) and returns the value to
+        cache, typically a DataFrame. Cached values are shared between
+        callers and must not be mutated.
+    base_url: str
+        Root of the summary feeds. Point it to a local stub server to test.
+    on_fetch: callable
+        Called as ``on_fetch(key, seconds, status)`` after every request to
+        the USGS, status being the HTTP code or None if it failed.
+    shared: SharedFeedStore
+        Store shared with the other worker processes of the host. Before
+        fetching, a feed another worker already refreshed is taken from
+        it, and refreshes are single-flight across processes, so upstream
+        requests and parsing do not grow with the number of workers.
+    """
+
+    def __init__(self, parse, base_url=USGS_FEED_URL, ttl=None,
+                 timeout=DEFAULT_TIMEOUT, pool_size=8, session=None, on_fetch=None, shared=None):
+        self.parse = parse
+        self.on_fetch = on_fetch
+        self.shared = shared
+        self.base_url = base_url.rstrip('/')
+        self.ttl = dict(FEED_TTL, **(ttl or {}))
+        self.timeout = timeout
+
+        if session is None:
+            # Sesión con pool keep-alive compartida por todos los callbacks
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._revalidating = set()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0,
+                       'not_modified': 0, 'fetches': 0, 'errors': 0, 'shared': 0}
+
+    @staticmethod
+    def key(magnitud, intervalo):
+        return float(magnitud), intervalo
+
+    def url(self, magnitud, intervalo):
+        return f"{self.base_url}/{float(magnitud)}_{intervalo}.geojson"
+
+    def get(self, magnitud=4.5, intervalo='day'):
+        """Return the parsed feed, fetching it only on a cold miss."""
+        key = self.key(magnitud, intervalo)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._count('misses')
+            return self._refresh(key).value
+
+        if self._age(entry) < self._ttl(key):
+            self._count('hits')
+        else:
+            self._count('stale')
+            self._revalidate_async(key)
+        return entry.value
+
+    def refresh(self, magnitud=4.5, intervalo='day', max_age=0):
+        """
+        Revalidate the feed now, ignoring its TTL, and return the value.
+
+        max_age: float
+            A feed fetched less than ``max_age`` seconds ago, by this
+            process or by another worker through ``shared``, is returned
+            without revalidating it.
+        """
+        return self._refresh(self.key(magnitud, intervalo), max_age).value
+
+    def fetched_at(self, magnitud=4.5, intervalo='day'):
+        """Epoch seconds of the download of the cached feed, or None."""
+        entry = self._entries.get(self.key(magnitud, intervalo))
+        return entry.fetched if entry is not None else None
+
+    def stats(self):
+        """Snapshot of the counters plus the hit rate (stale counts as hit)."""
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats['hits'] + stats['stale'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale']) / served if served else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _ttl(self, key):
+        return self.ttl.get(key[1], 60)
+
+    @staticmethod
+    def _age(entry):
+        return time.time() - entry.fetched
+
+    def _refresh(self, key, max_age=None):
+        if max_age is None:
+            max_age = self._ttl(key)
+
+        # Un solo request por feed aunque varios callbacks lleguen a la vez
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and self._age(entry) < max_age:
+                return entry
+            if self.shared is None:
+                return self._fetch(key, entry)
+
+            # Y uno solo entre todos los workers: el resto espera el lock y
+            # toma lo que descargó el que lo tenía
+            start = time.time()
+            entry = self._adopt(key, entry)
+            if entry is not None and self._age(entry) < max_age:
+                return entry
+            with self.shared.lock(key):
+                entry = self._adopt(key, entry)
+                if entry is not None and (entry.fetched >= start or self._age(entry) < max_age):
+                    return entry
+                entry = self._fetch(key, entry)
+                self.shared.write(key, SharedEntry(*entry))
+            return entry
+
+    def _adopt(self, key, entry):
+        """Take the feed from ``shared`` if another worker has a newer one."""
+        shared = self.shared.read(key)
+        if shared is None or (entry is not None and shared.fetched <= entry.fetched):
+            return entry
+        self._count('shared')
+        entry = self._entries[key] = _Entry(*shared)
+        return entry
+
+    def _fetch(self, key, entry):
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        self._count('fetches')
+        start, status = time.monotonic(), None
+        try:
+            response = self.session.get(self.url(*key), headers=headers, timeout=self.timeout)
+            status = response.status_code
+        finally:
+            if self.on_fetch is not None:
+                self.on_fetch(key, time.monotonic() - start, status)
+
+        if response.status_code == 304 and entry is not None:
+            self._count('not_modified')
+            value = entry.value
+        else:
+            response.raise_for_status()
+            value = self.parse(response.content)
+
+        entry = _Entry(value=value,
+                       fetched=time.time(),
+                       etag=response.headers.get('ETag', entry.etag if entry else None),
+                       last_modified=response.headers.get(
+                           'Last-Modified', entry.last_modified if entry else None))
+        self._entries[key] = entry
+        return entry
+
+    def _revalidate_async(self, key):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._refresh(key)
+            except Exception:
+                # Se sigue sirviendo el dato stale hasta el próximo intento
+                self._count('errors')
+                logger.exception("Error revalidating feed %s_%s", *key)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, name=f"revalidate-{key[0]}_{key[1]}", daemon=True).start()
@@ -0,0 +1,37 @@
+import threading
+from collections import OrderedDict
+
+
+class PerFrameCache:
+    """
+    Small LRU of structures derived from a DataFrame (indices, sort orders)
+    keyed by the frame object itself.
+
+    DataFrames are not hashable, so entries are keyed by ``id(df)`` and keep
+    a reference to the frame, which guarantees the id is not reused while
+    the entry is alive. The frames are the shared ones the scheduler keeps
+    per dropdown combination, so a handful of entries is enough.
+    """
+
+    def __init__(self, build, maxsize=16):
+        self.build = build
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __call__(self, df):
+        with self._lock:
+            entry = self._entries.get(id(df))
+            if entry is not None and entry[0] is df:
+                self._entries.move_to_end(id(df))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = self.build(df)
+        with self._lock:
+            self._entries[id(df)] = (df, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
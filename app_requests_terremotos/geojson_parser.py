@@ -0,0 +1,79 @@
+import io
+import json
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# Decoder JSON rápido si está instalado
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+# Parser incremental para payloads grandes (opcional)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+PROPERTIES = ('mag', 'place', 'time', 'tz', 'type', 'title')
+COLUMNS = PROPERTIES + ('id', 'lon', 'lat', 'depth')
+
+_get_properties = itemgetter(*PROPERTIES)
+
+
+def _iter_features(content, streaming):
+    if not streaming:
+        return _loads(content)['features']
+    if ijson is None:
+        raise ImportError("streaming=True requires the 'ijson' package")
+    if isinstance(content, (bytes, bytearray)):
+        content = io.BytesIO(content)
+    return ijson.items(content, 'features.item', use_float=True)
+
+
+def parse_feed(content, streaming=False):
+    """
+    Parse a USGS summary feed into typed columns in a single pass.
+
+    content: bytes, str or binary file object
+        GeoJSON FeatureCollection as returned by the USGS. File objects
+        are only accepted with ``streaming=True``.
+    streaming: bool
+        Decode the features one at a time with ijson instead of loading
+        the whole document, which keeps peak memory low on the month feeds.
+
+    Returns
+    -------
+    pandas DataFrame with the columns in ``COLUMNS``
+    """
+    properties, ids, coordinates = [], [], []
+    for feature in _iter_features(content, streaming):
+        properties.append(_get_properties(feature['properties']))
+        ids.append(feature['id'])
+        coordinates.append(feature['geometry']['coordinates'])
+
+    mag, place, time, tz, tipo, title = zip(*properties) if properties else ((),) * len(PROPERTIES)
+    xyz = np.array(coordinates, dtype='float64').reshape(-1, 3)
+
+    return pd.DataFrame({
+        'mag': np.array(mag, dtype='float64'),
+        'place': np.array(place, dtype=object),
+        'time': pd.to_datetime(np.array(time, dtype='int64'), unit='ms', origin='unix'),
+        'tz': np.array(tz, dtype='float64'),
+        'type': np.array(tipo, dtype=object),
+        'title': np.array(title, dtype=object),
+        'id': np.array(ids, dtype=object),
+        'lon': xyz[:, 0],
+        'lat': xyz[:, 1],
+        'depth': xyz[:, 2],
+    }, columns=COLUMNS)
+
+
+def empty_frame():
+    """Frame with the columns and dtypes of ``parse_feed`` and no rows."""
+    return parse_feed(b'{"features": []}')
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+
+from geojson_parser import empty_frame
+
+logger = logging.getLogger(__name__)
+
+MAGNITUDES = (1.0, 2.5, 4.5)
+INTERVALOS = ('hour', 'day', 'week', 'month')
+
+INTERVAL_SECONDS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400}
+
+# Sólo se descargan feeds M1.0, el resto de magnitudes sale del store
+SOURCE_MAGNITUDE = 1.0
+
+# Cada cuánto se pide el delta (normalmente el feed 'hour')
+DELTA_CADENCE = 60
+
+# Borde del feed que no se usa para detectar eventos borrados, por el
+# desfase entre la generación del feed en la USGS y nuestro reloj
+DELETE_MARGIN = 300
+
+# Espera antes de reintentar un sync que falló
+RETRY_SECONDS = 30
+
+
+def feed_for_gap(gap):
+    """Smallest summary feed that covers ``gap`` seconds since the last sync."""
+    if gap is not None:
+        for intervalo in INTERVALOS:
+            if gap + DELETE_MARGIN <= INTERVAL_SECONDS[intervalo]:
+                return intervalo
+    return 'month'
+
+
+class FeedScheduler:
+    """
+    Background thread that keeps every (magnitud, intervalo) combination
+    of the dropdowns in memory.
+
+    Each cycle downloads the smallest M1.0 feed that covers the time since
+    the last sync (the 'hour' feed in steady state, the month feed on an
+    empty store) and merges it into ``store``. The dropdown combinations
+    are then answered with indexed queries and kept in memory, so
+    callbacks never wait on the USGS.
+
+    cache: FeedCache
+        Used to download the feeds, so conditional GETs still apply.
+    store: EventStore
+        Persistent event store the deltas are merged into.
+    """
+
+    def __init__(self, cache, store, cadence=DELTA_CADENCE):
+        self.cache = cache
+        self.store = store
+        self.cadence = cadence
+        self._frames = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='feed-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get(self, magnitud=4.5, intervalo='day', bloquear=True):
+        """
+        Return the in-memory frame for the combination. Before the first
+        sync it falls back to the store, or to a direct cache read when
+        the store is empty.
+
+        bloquear: bool
+            With False the cache read is skipped and an empty frame is
+            returned instead, so nothing waits on the USGS (app startup).
+        """
+        df = self._frames.get((float(magnitud), intervalo))
+        if df is None:
+            if self.store.last_sync() is not None:
+                df = self.store.query(min_mag=magnitud, start=time.time() - INTERVAL_SECONDS[intervalo])
+            elif bloquear:
+                df = self.cache.get(magnitud, intervalo)
+            else:
+                df = empty_frame()
+        return df
+
+    def sync(self):
+        """Pull the delta feed, merge it and rebuild the in-memory frames."""
+        now = time.time()
+        last_sync = self.store.last_sync()
+        feed = feed_for_gap(None if last_sync is None else now - last_sync)
+
+        # Con varios workers, el primero que llega descarga el delta y el
+        # resto toma el mismo snapshot del cache compartido
+        df = self.cache.refresh(SOURCE_MAGNITUDE, feed, max_age=self.cadence / 2)
+        snapshot = '%s_%s@%r' % (SOURCE_MAGNITUDE, feed, self.cache.fetched_at(SOURCE_MAGNITUDE, feed))
+        counts = self.store.merge(df,
+                                  start=now - INTERVAL_SECONDS[feed] + DELETE_MARGIN,
+                                  end=now,
+                                  min_mag=SOURCE_MAGNITUDE,
+                                  synced_at=now,
+                                  snapshot=snapshot)
+        logger.info("Synced %s_%s feed: %s", SOURCE_MAGNITUDE, feed, counts)
+
+        frames = {}
+        for intervalo in INTERVALOS:
+            for magnitud in MAGNITUDES:
+                frames[(magnitud, intervalo)] = self.store.query(
+                    min_mag=magnitud, start=now - INTERVAL_SECONDS[intervalo])
+        self._frames = frames
+
+        return counts
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                wait = self.cadence
+            except Exception:
+                logger.exception("Error syncing earthquake feeds")
+                wait = min(RETRY_SECONDS, self.cadence)
+            self._stop.wait(wait)
@@ -0,0 +1,99 @@
+import os
+import pickle
+import tempfile
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+# flock sólo existe en POSIX; en Windows queda sólo el lock entre hilos
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SharedEntry = namedtuple('SharedEntry', ['value', 'fetched', 'etag', 'last_modified'])
+
+
+class SharedFeedStore:
+    """
+    Parsed USGS feeds shared by every worker process of a host.
+
+    Each feed is a pickle in ``directory``, written atomically by the
+    worker that downloaded and parsed it, so the other workers load the
+    parsed frame instead of fetching and parsing it again. A ``.lock``
+    file per feed, taken with ``flock``, makes the refresh single-flight
+    across processes: the worker holding it downloads, the others wait on
+    it and then read what it wrote.
+
+    directory: str
+        Folder for the feeds; use one readable only by the app, since the
+        pickles are loaded as trusted.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.directory = directory
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, '%s_%s%s' % (key[0], key[1], suffix))
+
+    def read(self, key):
+        """SharedEntry last written for ``key``, or None."""
+        path = self._path(key, '.pkl')
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        # Se deserializa sólo si otro worker lo reescribió desde la última lectura
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            loaded = self._loaded.get(key)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        with self._lock:
+            self._loaded[key] = (version, entry)
+        return entry
+
+    def write(self, key, entry):
+        """Publish ``entry`` for ``key``; readers never see a partial file."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key, '.pkl'))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def clear(self):
+        """Remove every published feed."""
+        with self._lock:
+            self._loaded.clear()
+        for nombre in os.listdir(self.directory):
+            if nombre.endswith('.pkl'):
+                try:
+                    os.unlink(os.path.join(self.directory, nombre))
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def lock(self, key):
+        """Exclusive lock on ``key`` among the processes sharing ``directory``."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(key, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
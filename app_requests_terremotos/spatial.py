@@ -0,0 +1,141 @@
+import numpy as np
+
+from frame_cache import PerFrameCache
+
+# Sobre este zoom se vuelven a mostrar los sismos individuales
+MARKER_ZOOM = 4
+
+# Bajo MARKER_ZOOM se muestran marcadores sólo si caben en este número
+MAX_MARKERS = 1500
+
+# Tope de marcadores sobre MARKER_ZOOM; se conservan los de mayor magnitud
+MAX_MARKERS_ZOOMED = 5000
+
+# Lado de cada celda de agregación, en pixeles de pantalla
+BIN_PX = 32
+
+# Tamaño aproximado del mapa cuando relayoutData no trae las esquinas
+DEFAULT_VIEWPORT_PX = (1200, 700)
+
+# Fracción del viewport que se agrega a cada lado para poder hacer pan
+# sin ver zonas vacías antes de que responda el callback
+PADDING = 0.25
+
+TILE_PX = 512
+
+
+class SpatialIndex:
+    """
+    Events sorted by longitude so a bounding box becomes one or two
+    ``searchsorted`` slices plus a latitude mask over the slice.
+    """
+
+    def __init__(self, df):
+        self.order = np.argsort(df['lon'].to_numpy(), kind='stable')
+        self.lon = df['lon'].to_numpy()[self.order]
+        self.lat = df['lat'].to_numpy()[self.order]
+
+    def _slice(self, lon_min, lon_max, lat_min, lat_max):
+        i = np.searchsorted(self.lon, lon_min, side='left')
+        j = np.searchsorted(self.lon, lon_max, side='right')
+        lat = self.lat[i:j]
+        return self.order[i:j][(lat >= lat_min) & (lat <= lat_max)]
+
+    def query(self, bbox):
+        """Row positions inside bbox = (lon_min, lat_min, lon_max, lat_max)."""
+        lon_min, lat_min, lon_max, lat_max = bbox
+        if lon_max - lon_min >= 360:
+            return self._slice(-180, 180, lat_min, lat_max)
+
+        # Normalizar a [-180, 180) y partir en dos si cruza el antimeridiano
+        lon_min = (lon_min + 180) % 360 - 180
+        lon_max = lon_min + (bbox[2] - bbox[0])
+        if lon_max <= 180:
+            return self._slice(lon_min, lon_max, lat_min, lat_max)
+        return np.concatenate([self._slice(lon_min, 180, lat_min, lat_max),
+                               self._slice(-180, lon_max - 360, lat_min, lat_max)])
+
+
+# Un índice por frame vivo (uno por combinación de los dropdowns)
+index_for = PerFrameCache(SpatialIndex)
+
+
+def viewport(relayoutData, size=DEFAULT_VIEWPORT_PX):
+    """
+    Zoom and bounding box of the map from its ``relayoutData``.
+
+    Returns
+    -------
+    Tuple (zoom, bbox). bbox is (lon_min, lat_min, lon_max, lat_max), padded
+    by ``PADDING``, or None when the whole world is visible.
+    """
+    relayoutData = relayoutData or {}
+    zoom = float(relayoutData.get('mapbox.zoom', 0))
+
+    corners = (relayoutData.get('mapbox._derived') or {}).get('coordinates')
+    if corners:
+        lons = [c[0] for c in corners]
+        lats = [c[1] for c in corners]
+        lon_min, lon_max, lat_min, lat_max = min(lons), max(lons), min(lats), max(lats)
+    elif 'mapbox.center' in relayoutData:
+        center = relayoutData['mapbox.center']
+        deg_px = 360 / (TILE_PX * 2 ** zoom)
+        half_w, half_h = size[0] * deg_px / 2, size[1] * deg_px / 2
+        lon_min, lon_max = center['lon'] - half_w, center['lon'] + half_w
+        lat_min, lat_max = center['lat'] - half_h, center['lat'] + half_h
+    else:
+        return zoom, None
+
+    pad_lon, pad_lat = (lon_max - lon_min) * PADDING, (lat_max - lat_min) * PADDING
+    lon_min, lon_max = lon_min - pad_lon, lon_max + pad_lon
+    lat_min, lat_max = max(lat_min - pad_lat, -90), min(lat_max + pad_lat, 90)
+    if lon_max - lon_min >= 360 and lat_min <= -90 and lat_max >= 90:
+        return zoom, None
+    return zoom, (lon_min, lat_min, lon_max, lat_max)
+
+
+def cull(df, bbox):
+    """Rows of ``df`` inside ``bbox``; the same frame if bbox is None."""
+    if bbox is None:
+        return df
+    return df.iloc[np.sort(index_for(df).query(bbox))]
+
+
+def aggregate(df, zoom):
+    """
+    Square bins of ``BIN_PX`` screen pixels at ``zoom``.
+
+    Returns
+    -------
+    DataFrame with lon/lat (mean of the events), count and mag (maximum)
+    per non-empty bin
+    """
+    cell = 360 * BIN_PX / (TILE_PX * 2 ** zoom)
+    cx = np.floor((df['lon'].to_numpy() + 180) / cell).astype('int64')
+    cy = np.floor((df['lat'].to_numpy() + 90) / cell).astype('int64')
+
+    bins = df[['lon', 'lat', 'mag']].groupby([cx, cy], sort=False).agg(
+        lon=('lon', 'mean'), lat=('lat', 'mean'), count=('mag', 'size'), mag=('mag', 'max'))
+    return bins.reset_index(drop=True)
+
+
+def show_markers(n, zoom):
+    return zoom >= MARKER_ZOOM or n <= MAX_MARKERS
+
+
+def visible_events(df, relayoutData):
+    """
+    Events to draw for the current viewport.
+
+    Returns
+    -------
+    Tuple (DataFrame, aggregated). When aggregated is True the frame holds
+    bins from ``aggregate`` instead of individual events.
+    """
+    zoom, bbox = viewport(relayoutData)
+    df = cull(df, bbox)
+    if show_markers(len(df), zoom):
+        if len(df) > MAX_MARKERS_ZOOMED:
+            df = df.nlargest(MAX_MARKERS_ZOOMED, 'mag')
+        return df, False
+    return aggregate(df, zoom), True
@@ -0,0 +1,211 @@
+import math
+import re
+
+import numpy as np
+
+from frame_cache import PerFrameCache
+
+# Columnas que se muestran en la tabla
+TABLE_COLUMNS = ('place', 'mag')
+
+# Orden por defecto, igual al de la tabla original
+DEFAULT_SORT = [{'column_id': 'mag', 'direction': 'desc'}]
+
+# Operadores de filter_query de dash_table, en el orden en que se buscan
+OPERATORS = [['ge ', '>='],
+             ['le ', '<='],
+             ['lt ', '<'],
+             ['gt ', '>'],
+             ['ne ', '!='],
+             ['eq ', '='],
+             ['contains '],
+             ['datestartswith ']]
+
+# Operadores que comparan valores; el resto busca texto
+COMPARISONS = ('ge', 'le', 'lt', 'gt', 'ne', 'eq')
+
+
+def split_filter_part(filter_part):
+    """
+    Split one ``{columna} operador valor`` term of a filter_query.
+
+    Returns
+    -------
+    Tuple (column, operator, value); (None, None, None) if not understood.
+    Unquoted values of comparisons are floats when they parse as one; the
+    text operators always get the value as written.
+    """
+    for operator_type in OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                elif operator_type[0].strip() not in COMPARISONS:
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # Se devuelve siempre el nombre largo del operador
+                return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+class TableIndex:
+    """
+    Presorted columns of an events frame to answer the custom paging,
+    sorting and filtering of the DataTable.
+
+    Rows are kept in descending magnitude order, so every numeric filter on
+    ``mag`` is a binary search and the default sort is free. Other sort
+    orders are computed the first time they are requested.
+    """
+
+    def __init__(self, df):
+        self.columns = {col: df[col].to_numpy() for col in TABLE_COLUMNS}
+        if 'time' in df:
+            self.columns['time'] = df['time'].to_numpy()
+
+        mag = self.columns['mag'].astype('float64')
+        self.by_mag = np.argsort(-mag, kind='stable')  # NaN al final
+        # Magnitudes ascendentes para searchsorted; NaN queda al final
+        self._neg_mag_sorted = -mag[self.by_mag]
+        self._ranks = {}
+        self._texts = {}
+
+    def __len__(self):
+        return len(self.by_mag)
+
+    def _mag_range(self, operator, value):
+        """Slice of ``by_mag`` matching ``mag <operator> value``."""
+        neg = self._neg_mag_sorted
+        lo, hi = 0, int(np.searchsorted(neg, np.nan, side='left'))
+        if operator == 'ge':
+            hi = min(hi, int(np.searchsorted(neg, -value, side='right')))
+        elif operator == 'gt':
+            hi = min(hi, int(np.searchsorted(neg, -value, side='left')))
+        elif operator == 'le':
+            lo = int(np.searchsorted(neg, -value, side='left'))
+        elif operator == 'lt':
+            lo = int(np.searchsorted(neg, -value, side='right'))
+        elif operator == 'eq':
+            lo = int(np.searchsorted(neg, -value, side='left'))
+            hi = min(hi, int(np.searchsorted(neg, -value, side='right')))
+        return lo, max(lo, hi)
+
+    def _rank(self, column):
+        """Position of each row when sorted ascending by ``column``."""
+        rank = self._ranks.get(column)
+        if rank is None:
+            values = self.columns[column]
+            if values.dtype == object:
+                values = values.astype(str)
+            order = np.argsort(values, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self._ranks[column] = rank
+        return rank
+
+    def _contains(self, column, value):
+        """
+        Boolean mask of the rows whose ``column`` contains ``value``.
+
+        The column is joined once into a single string so every search is
+        one C-level regex scan instead of a Python loop over the rows.
+        """
+        text = self._texts.get(column)
+        if text is None:
+            values = [str(v) for v in self.columns[column]]
+            offsets = np.cumsum([0] + [len(v) + 1 for v in values[:-1]])
+            text = self._texts[column] = ('\n'.join(values), offsets)
+
+        joined, offsets = text
+        mask = np.zeros(len(offsets), dtype=bool)
+        value = str(value)
+        if value and '\n' not in value:
+            hits = [m.start() for m in re.finditer(re.escape(value), joined)]
+            mask[np.searchsorted(offsets, hits, side='right') - 1] = True
+        return mask
+
+    def filter(self, filter_query):
+        """Row positions matching ``filter_query``, in descending magnitude."""
+        lo, hi = 0, len(self.by_mag)
+        masks = []
+
+        for part in (filter_query or '').split(' && '):
+            column, operator, value = split_filter_part(part)
+            if column not in self.columns:
+                continue
+            if column == 'mag' and operator in ('ge', 'gt', 'le', 'lt', 'eq') and isinstance(value, float):
+                r_lo, r_hi = self._mag_range(operator, value)
+                lo, hi = max(lo, r_lo), min(hi, r_hi)
+            else:
+                masks.append((column, operator, value))
+
+        rows = self.by_mag[lo:max(lo, hi)]
+        for column, operator, value in masks:
+            if operator == 'contains':
+                rows = rows[self._contains(column, value)[rows]]
+                continue
+
+            values = self.columns[column][rows]
+            if operator == 'datestartswith':
+                keep = np.char.startswith(values.astype(str), str(value))
+            elif operator == 'eq':
+                keep = values == value
+            elif operator == 'ne':
+                keep = values != value
+            else:
+                try:
+                    keep = {'ge': np.greater_equal, 'le': np.less_equal,
+                            'gt': np.greater, 'lt': np.less}[operator](values, value)
+                except TypeError:
+                    # Texto contra número o al revés: ninguna fila cumple
+                    keep = np.zeros(len(rows), dtype=bool)
+            rows = rows[keep]
+        return rows
+
+    def page(self, page_current=0, page_size=15, sort_by=None, filter_query=''):
+        """
+        Returns
+        -------
+        Tuple (records, page_count) with only the rows of the requested page
+        """
+        rows = self.filter(filter_query)
+
+        sort = (sort_by or DEFAULT_SORT)[0]
+        column, descending = sort['column_id'], sort['direction'] == 'desc'
+        if column == 'mag':
+            if not descending:
+                rows = rows[::-1]
+        elif column in self.columns:
+            rows = rows[np.argsort(self._rank(column)[rows], kind='stable')]
+            if descending:
+                rows = rows[::-1]
+
+        page_count = max(1, math.ceil(len(rows) / page_size))
+        page_current = min(page_current or 0, page_count - 1)
+        rows = rows[page_current * page_size:(page_current + 1) * page_size]
+
+        records = []
+        for i in rows:
+            record = {}
+            for col in TABLE_COLUMNS:
+                value = self.columns[col][i]
+                if isinstance(value, float) and math.isnan(value):
+                    value = None
+                record[col] = value.item() if isinstance(value, np.generic) else value
+            records.append(record)
+        return records, page_count
+
+
+# Un índice por frame vivo (uno por combinación de los dropdowns)
+index_for = PerFrameCache(TableIndex)
@@ -1,9 +1,57 @@
-import requests
-import pandas as pd
-import plotly.express as px
+import os
+
 import dash_table
 
-def get_earthquake_df(magnitud=4.5, intervalo='day'):
+from feed_cache import FeedCache
+from event_store import EventStore
+from geojson_parser import parse_feed
+from prefetch import FeedScheduler
+from shared_store import SharedFeedStore
+from figuras import Esqueletos, llenar
+from metricas import fase, registro
+import spatial
+import table_index
+
+# Filas por página de la tabla
+PAGE_SIZE = 15
+
+
+def registrar_descarga(key, segundos, status):
+    """Latencia de cada request a la USGS, para /metrics"""
+    registro.histograma('geoapps_usgs_fetch_seconds', 'Latency of the USGS feed requests.').observar(
+        segundos, feed='%s_%s' % key, status=status or 'error')
+
+
+# Histórico local de eventos, se actualiza con deltas del feed 'hour'
+STORE_PATH = os.environ.get('SISMOS_DB', os.path.join(os.path.dirname(__file__), 'data', 'sismos.sqlite'))
+event_store = EventStore(STORE_PATH)
+
+# Feeds ya parseados, compartidos por los workers de gunicorn del host;
+# SISMOS_FEEDS_DIR vacío lo desactiva
+FEEDS_DIR = os.environ.get('SISMOS_FEEDS_DIR', os.path.join(os.path.dirname(STORE_PATH), 'feeds'))
+
+# Cache compartido por todos los callbacks de la app
+feed_cache = FeedCache(parse=parse_feed, on_fetch=registrar_descarga,
+                       shared=SharedFeedStore(FEEDS_DIR) if FEEDS_DIR else None)
+
+# Mantiene todos los feeds en memoria; se inicia desde app.py
+scheduler = FeedScheduler(feed_cache, event_store)
+
+
+
+def aciertos_feed():
+    """(aciertos, fallos) del cache de feeds; servir stale cuenta como acierto"""
+    stats = feed_cache.stats()
+    return stats['hits'] + stats['stale'], stats['misses']
+
+
+# Aciertos de los caches, expuestos en /metrics
+registro.cache('feed', aciertos_feed)
+registro.cache('spatial_index', lambda: (spatial.index_for.hits, spatial.index_for.misses))
+registro.cache('table_index', lambda: (table_index.index_for.hits, table_index.index_for.misses))
+
+
+def get_earthquake_df(magnitud=4.5, intervalo='day', bloquear=True):
     """
     magnitud: int 
         Choice between 1, 2.5 or 4.5, that represents the minimun value
@@ -11,46 +59,51 @@ def get_earthquake_df(magnitud=4.5, intervalo='day'):
     intervalo: str
         Choice between "hour", "day", "week" and "month" that defines 
         the max time interval for the events. Defaults to last day.
+    bloquear: bool
+        With False it never waits on the network: before the first sync
+        it returns the stored events or an empty frame.
 
     Returns
     -------
-    Python dictionary    
+    Tuple (DataFrame, magnitud, intervalo). The DataFrame is shared
+    through ``scheduler`` and must not be modified in place.
     """
-    
-    # request the API with the given parameters
-    request = requests.get(f"https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/{magnitud}_{intervalo}.geojson")
-    
-    # convert response to a dictionary
-    request_dict = request.json()
-
-    df = pd.json_normalize(data=request_dict, record_path='features', errors='ignore')
-    df.columns = df.columns.str.replace('properties.', '', regex=False)
-    df.columns = df.columns.str.replace('geometry.', '', regex=False)
-
-    df = df[['mag', 'place', 'time', 'tz', 'type', 'title', 'coordinates']] # Filtrando columnas relevantes
-    df['time'] = pd.to_datetime(df['time'], unit='ms', origin='unix') # Unix time to datetime Series
+    df = scheduler.get(magnitud, intervalo, bloquear)
 
-    # unpacking the geometry in coordinates
-    df_geometry = df['coordinates'].apply(pd.Series) # unpack coordinates
-    df_geometry = df_geometry.rename(columns={0: 'lon', 1: 'lat', 2: 'depth'}) # rename columns
-
-    # df.head()
-    df = df.join(df_geometry)
-    df.head()
-    
     return df, magnitud, intervalo
 
-def plot_map(df):
-    fig = px.scatter_mapbox(df, lat='lat', lon='lon', 
-                            size='mag',
-                            size_max=15,
-                            color='mag',
-                            color_continuous_scale='viridis_r',
-                            hover_data={'mag': True, 'time': True},
-                            hover_name='title',
-                            mapbox_style='carto-positron',
-                            opacity=0.65,
-                            zoom=0)
+def plot_map_px(df, agregado):
+    """
+    Map of the events of ``df`` built with Plotly Express: the skeleton
+    ``plot_map`` fills. ``agregado`` tells whether ``df`` holds events or
+    aggregated bins.
+    """
+    # Plotly Express tarda medio segundo en importarse; se carga con el
+    # primer mapa y no al importar la app
+    import plotly.express as px
+
+    if agregado:
+        fig = px.scatter_mapbox(df, lat='lat', lon='lon',
+                                size='count',
+                                size_max=30,
+                                color='mag',
+                                color_continuous_scale='viridis_r',
+                                hover_data={'count': True, 'mag': True, 'lat': False, 'lon': False},
+                                labels={'count': 'sismos', 'mag': 'mag máx'},
+                                mapbox_style='carto-positron',
+                                opacity=0.65,
+                                zoom=0)
+    else:
+        fig = px.scatter_mapbox(df, lat='lat', lon='lon', 
+                                size='mag',
+                                size_max=15,
+                                color='mag',
+                                color_continuous_scale='viridis_r',
+                                hover_data={'mag': True, 'time': True},
+                                hover_name='title',
+                                mapbox_style='carto-positron',
+                                opacity=0.65,
+                                zoom=0)
     fig.update_layout(
         title={
             'x': 0.5
@@ -64,7 +117,9 @@ def plot_map(df):
             b=0,
             t=0,
             pad=0
-            )
+            ),
+        # Mantiene el zoom/pan del usuario entre actualizaciones
+        uirevision='mapa'
         )
 
     fig.update_coloraxes(
@@ -77,20 +132,69 @@ def plot_map(df):
     
     return fig
 
-def plot_table(df):
-    df = df[['place', 'mag']]
 
-    df = df.sort_values(by='mag', ascending=False)
+# Esqueletos del mapa con eventos y con bins (figuras.py): px arma cada uno
+# una vez y cada request sólo pone los datos
+esqueletos_mapa = Esqueletos(plot_map_px)
+
+
+def plot_map(df, relayoutData=None):
+    """
+    Map of the events visible in the viewport described by ``relayoutData``.
+    Zoomed out on large feeds the events are aggregated in bins sized by
+    the number of events and colored by their maximum magnitude.
+
+    Returns
+    -------
+    dict with the figure, equal to the one of ``plot_map_px``
+    """
+    with fase('datos'):
+        df, agregado = spatial.visible_events(df, relayoutData)
+
+    with fase('figura'):
+        # Sin eventos px no arma la traza: es otro esqueleto
+        esqueleto = esqueletos_mapa.get((agregado, df.empty), df, agregado)
+        if agregado:
+            tamaño, tamaño_max = df['count'], 30
+            traza = {'customdata': df[['count', 'mag', 'lat', 'lon']].to_numpy()}
+        else:
+            tamaño, tamaño_max = df['mag'], 15
+            traza = {'customdata': df[['mag', 'time']].to_numpy(dtype=object),
+                     'hovertext': df['title'].to_numpy()}
+        traza.update({
+            'lat': df['lat'].to_numpy(),
+            'lon': df['lon'].to_numpy(),
+            'marker.color': df['mag'].to_numpy(),
+            'marker.size': tamaño.to_numpy(),
+            # Como px: el mayor de los tamaños ocupa size_max pixeles
+            'marker.sizeref': tamaño.max() / tamaño_max ** 2
+        })
+        return llenar(esqueleto, [traza],
+                      layout={'mapbox.center': {'lat': df['lat'].mean(), 'lon': df['lon'].mean()}})
+
+def plot_table(df):
+    """
+    DataTable with server-side paging, sorting and filtering: only the
+    first page is embedded, the rest is served by the ``update_tabla``
+    callback through ``table_index``.
+    """
+    data, page_count = table_index.index_for(df).page(0, PAGE_SIZE)
 
     return dash_table.DataTable(
         id='dash-table',
-        data=df.to_dict('records'),
-        columns=[{'name': i, 'id': i} for i in df.columns],
+        data=data,
+        columns=[{'name': 'place', 'id': 'place'},
+                 {'name': 'mag', 'id': 'mag', 'type': 'numeric'}],
         style_table={ 'maxHeight': '95vh','overflowX':'auto', 'overflowY': 'auto'},
-        filter_action="native",
-        page_action="native",
+        filter_action="custom",
+        filter_query='',
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        page_action="custom",
         page_current=0,
-        page_size=15,
+        page_size=PAGE_SIZE,
+        page_count=page_count,
         style_cell={
             'minWidth': 95, 'maxWidth': 95, 'width': 95
         },
@@ -98,4 +202,13 @@ def plot_table(df):
             'whiteSpace': 'normal',
             'height': 'auto'
         }
-    )
\ No newline at end of file
+    )
+
+
+def table_page(df, page_current, page_size, sort_by, filter_query):
+    """
+    Returns
+    -------
+    Tuple (records, page_count) for the requested page of the table
+    """
+    return table_index.index_for(df).page(page_current, page_size, sort_by, filter_query)
\ No newline at end of file
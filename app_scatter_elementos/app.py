@@ -1,98 +1,206 @@
+import os
+import sys
+import threading
+import uuid
+from collections import namedtuple
+
 import dash
+import flask
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 
+from regresion import RegresionOLS
+from seleccion import Selecciones
+
+# Capa de datos y métricas compartidas (geodatos.py y metricas.py en la raíz del repo)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from figuras import Esqueletos, forma, llenar
+from configuracion import configurar_proceso, crear_app
+from metricas import fase
+import hidroquimica
+import plantillas
+
+
+# Datos de la app, armados a partir de la tabla derivada:
+# - df_elementos: iones mayores en meq/L y error de balance, derivados de la
+#   tabla de geoquímica (mg/L)
+# - indice_error: las muestras ordenadas por error
+# - regresion: estadísticos suficientes de la regresión para todos los pares de columnas
+# - selecciones: muestras activas de cada sesión, como máscara sobre las filas
+# - columnas_elementos: columnas como arrays, para tomar sólo las filas y columnas que se grafican
+Estado = namedtuple('Estado', ['df_elementos', 'indice_error', 'regresion', 'selecciones', 'columnas_elementos'])
+
+
+# Selecciones de las sesiones, compartidas por los workers de gunicorn del
+# host; SELECCIONES_DIR vacío las deja en cada proceso (requiere sesiones sticky)
+SELECCIONES_DIR = os.environ.get('SELECCIONES_DIR',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'selecciones'))
+
+
+def armar_estado(df_elementos, indice_error):
+    """Estado de la app para una tabla derivada y su índice de error"""
+    return Estado(df_elementos, indice_error, RegresionOLS(df_elementos),
+                  Selecciones(df_elementos['codigo'], SELECCIONES_DIR or None),
+                  {columna: df_elementos[columna].to_numpy() for columna in df_elementos.columns})
+
+
+_estado = None
+_lock_estado = threading.Lock()
+
 
-# Carga datos
-df_elementos = pd.read_csv(r"data/meq_cerror.csv")
-df_elementos = df_elementos.drop('Unnamed: 0', axis=1)
+def estado():
+    """
+    Estado de la versión vigente del CSV de geoquímica; se rearma cuando
+    hidroquimica.cargar devuelve otra tabla, así que las muestras agregadas
+    al CSV aparecen sin reiniciar la app
+    """
+    global _estado
+    df_elementos, indice_error = hidroquimica.cargar('geoquimica')
+    actual = _estado
+    if actual is None or actual.df_elementos is not df_elementos:
+        with _lock_estado:
+            if _estado is None or _estado.df_elementos is not df_elementos:
+                _estado = armar_estado(df_elementos, indice_error)
+            actual = _estado
+    return actual
 
-# Figura inicial
-fig = px.scatter(df_elementos, x="Cl", y="Na",
-                 hover_name='codigo',
-                 trendline='ols',
-                 title='Gráfico de correlación bivariada',
-                 trendline_color_override='#ff8080'
-                 )
-fig.update_xaxes(title={'font':{'size':22}})
-fig.update_yaxes(title={'font':{'size':22}})
-fig.update_layout(title={'x': 0.5})
+
+def muestras(actual, activas, columnas):
+    """``columnas`` of the rows in the boolean mask ``activas`` of ``actual``, indexed by codigo"""
+    arrays = actual.columnas_elementos
+    datos = {columna: arrays[columna][activas] for columna in dict.fromkeys(columnas) if columna != 'codigo'}
+    return pd.DataFrame(datos, index=pd.Index(arrays['codigo'][activas], name='codigo'))
+
+
+# Figura inicial de la tabla con la que se armó, ver figura_inicial
+_figura_inicial = (None, None)
+
+
+def figura_inicial():
+    """Figura inicial, se arma con el primer layout servido y al cambiar la tabla"""
+    global _figura_inicial
+    actual = estado()
+    df_guardado, fig = _figura_inicial
+    if df_guardado is actual.df_elementos:
+        return fig
+
+    df_elementos = actual.df_elementos
+    fig = px.scatter(df_elementos, x="Cl", y="Na",
+                     hover_name='codigo',
+                     title='Gráfico de correlación bivariada'
+                     )
+    fig.add_trace(go.Scatter(actual.regresion.linea(df_elementos['codigo'], 'Cl', 'Na')))
+    fig.update_xaxes(title={'font':{'size':22}})
+    fig.update_yaxes(title={'font':{'size':22}})
+    fig.update_layout(title={'x': 0.5})
+
+    _figura_inicial = (df_elementos, fig)
+    return fig
 
 
 """################################################# App ############################################################"""
 
-app = dash.Dash(__name__)
+# Métricas y compresión comunes a las apps (configuracion.py)
+app = crear_app(__name__)
 server = app.server
 
 """################################################# Layout #########################################################"""
 
-app.layout = html.Div(
-
-    [html.Div([
-        # Dropdown de columnas
-        html.Div(
-            [
-                html.H3('Eje X'),
-                dcc.Dropdown(id='x_col',
-                             options=[{'label': value, 'value': value} for value in df_elementos.columns],
-                             value='Cl'),
-                dcc.RadioItems(id='x_modo',
-                               options=[{'label': 'Linear', 'value': "Linear"}, {'label': 'Log', 'value': "Log"}],
-                               value="Linear", style={'textAlign': 'center'})
-            ], style={'width':'48%'}
-        ),
-        html.Div(
-            [
-                html.H3('Eje Y'),
-                dcc.Dropdown(id='y_col',
-                             options=[{'label': value, 'value': value} for value in df_elementos.columns],
-                             value='Na'),
-                dcc.RadioItems(id='y_modo',
-                               options=[{'label': 'Linear', 'value': "Linear"}, {'label': 'Log', 'value': "Log"}],
-                               value="Linear", style={'textAlign': 'center'})
-            ], style={'width':'48%'}
-                )
-
-                ], style={'display': 'flex', 'justifyContent': 'center', 'textAlign': 'center', 'height': '20vh'}
-                ),
-
-    html.Div([
-        # Grafico scatter
-        html.Div([
-            dcc.Graph(id='scatter-reg',
-                      figure=fig,
-                      children=[],
-                      style={'height': '100%'}
-                      ),
-                ], style={'width': '80%', 'height': '100%'}),
-
-        # Opciones: Input, regresion y dropdown muestras
-        html.Div([
-            html.H4('Eliminar muestra con un error (%) mayor a: '),
-            dcc.Input(id='input-error',
-                      type='number',
-                      value=30),
+def contenido(figura=None):
+    """
+    Contenido de la app, armado de nuevo en cada llamada con la figura
+    inicial; sin ella al validar el layout
+    """
+    df_elementos = estado().df_elementos
+    return html.Div(
+
+        [html.Div([
+            # Dropdown de columnas
+            html.Div(
+                [
+                    html.H3('Eje X'),
+                    dcc.Dropdown(id='x_col',
+                                 options=[{'label': value, 'value': value} for value in df_elementos.columns],
+                                 value='Cl'),
+                    dcc.RadioItems(id='x_modo',
+                                   options=[{'label': 'Linear', 'value': "Linear"}, {'label': 'Log', 'value': "Log"}],
+                                   value="Linear", style={'textAlign': 'center'})
+                ], style={'width':'48%'}
+            ),
             html.Div(
-                [html.H4('Línea de regresion (R2)'),
-                 dcc.RadioItems(id='check-regresion',
-                                options=[{'label': 'Si', 'value': 'Activado'},
-                                         {'label': 'No', 'value': 'No activada'}],
-                                value='Activado')
-                 ]
+                [
+                    html.H3('Eje Y'),
+                    dcc.Dropdown(id='y_col',
+                                 options=[{'label': value, 'value': value} for value in df_elementos.columns],
+                                 value='Na'),
+                    dcc.RadioItems(id='y_modo',
+                                   options=[{'label': 'Linear', 'value': "Linear"}, {'label': 'Log', 'value': "Log"}],
+                                   value="Linear", style={'textAlign': 'center'})
+                ], style={'width':'48%'}
+                    )
+
+                    ], style={'display': 'flex', 'justifyContent': 'center', 'textAlign': 'center', 'height': '20vh'}
                     ),
-            html.Hr(style={'size': '0.2px', 'color': 'grey'}),
-            html.H4('Muestras activas'),
-            dcc.Dropdown(id='muestras_activas',
-                         options=[{'label': muestra, 'value': muestra} for muestra in df_elementos['codigo'].unique()],
-                         value=df_elementos['codigo'].unique(),
-                         multi=True)
-                ], style={'width': '20%'})
-            ], style={'display': 'flex', 'height': '80vh', 'width': '100%', 'alignItems': 'center'})
 
-    ], style={'fontFamily': 'Lucida Sans'})
+        html.Div([
+            # Grafico scatter
+            html.Div([
+                dcc.Graph(id='scatter-reg',
+                          figure=figura or {},
+                          children=[],
+                          style={'height': '100%'}
+                          ),
+                    ], style={'width': '80%', 'height': '100%'}),
+
+            # Opciones: Input, regresion y dropdown muestras
+            html.Div([
+                html.H4('Eliminar muestra con un error (%) mayor a: '),
+                dcc.Input(id='input-error',
+                          type='number',
+                          value=30),
+                html.Div(
+                    [html.H4('Línea de regresion (R2)'),
+                     dcc.RadioItems(id='check-regresion',
+                                    options=[{'label': 'Si', 'value': 'Activado'},
+                                             {'label': 'No', 'value': 'No activada'}],
+                                    value='Activado')
+                     ]
+                        ),
+                html.Hr(style={'size': '0.2px', 'color': 'grey'}),
+                html.H4('Muestras activas'),
+                dcc.Dropdown(id='muestras_activas',
+                             options=[{'label': muestra, 'value': muestra} for muestra in df_elementos['codigo'].unique()],
+                             value=df_elementos['codigo'].unique(),
+                             multi=True),
+                # Cambios de la selección para el servidor (assets/seleccion.js)
+                dcc.Store(id='cambio-seleccion'),
+                dcc.Store(id='seleccion-anterior'),
+                dcc.Store(id='pedido-seleccion')
+                    ], style={'width': '20%'})
+                ], style={'display': 'flex', 'height': '80vh', 'width': '100%', 'alignItems': 'center'})
+
+        ], style={'fontFamily': 'Lucida Sans'})
+
+
+def serve_layout():
+    """
+    Layout con la figura inicial y una sesión nueva por carga de la página;
+    al importar la app no se arma la figura
+    """
+    # Cada request arma sus componentes: el árbol no se comparte entre sesiones
+    figura = figura_inicial() if flask.has_request_context() else None
+    return html.Div([contenido(figura), dcc.Store(id='sesion', data=uuid.uuid4().hex)])
+
+
+app.layout = serve_layout
+
+# La figura inicial se arma en segundo plano mientras arranca el servidor
+plantillas.precargar()
+threading.Thread(target=figura_inicial, name='warm-figura-inicial', daemon=True).start()
 
 """############################################### Callbacks ########################################################"""
 
@@ -102,38 +210,72 @@ app.layout = html.Div(
     [Input('input-error', 'value')])
 def filtrar_df(error):
     if error is None:
-        dash.exceptions.PreventUpdate
+        raise dash.exceptions.PreventUpdate
     else:
-        dfferror = df_elementos.copy()
-        filtro = dfferror.err < error
-        dfferror = dfferror.loc[filtro]
-        opciones = [{'label': value, 'value': value} for value in dfferror['codigo'].unique()], dfferror['codigo'].unique()
+        with fase('datos'):
+            actual = estado()
+            codigos = pd.unique(actual.columnas_elementos['codigo'][actual.indice_error.menores(error)])
+        opciones = [{'label': value, 'value': value} for value in codigos], codigos
 
 
         return opciones
 
 
+app.clientside_callback(ClientsideFunction(namespace='seleccion', function_name='cambio'),
+                        [Output('cambio-seleccion', 'data'),
+                         Output('seleccion-anterior', 'data')],
+                        [Input('muestras_activas', 'value'),
+                         Input('pedido-seleccion', 'data')],
+                        [State('seleccion-anterior', 'data')])
+
+
 @app.callback(
-    Output('scatter-reg', 'figure'),
+    [Output('scatter-reg', 'figure'),
+     Output('pedido-seleccion', 'data')],
     [Input('x_col', 'value'),
      Input('y_col', 'value'),
      Input('x_modo', 'value'),
      Input('y_modo', 'value'),
      Input('check-regresion', 'value'),
-     Input('muestras_activas', 'value')])
-def actualizar_grafico(columna_x, columna_y, x_axis_mode, y_axis_mode, checklist_regresion, muestra_activa):
-    df_filtrado = df_elementos.copy()
-    df_filtrado = df_filtrado.set_index('codigo')
-    df_filtrado = df_filtrado.loc[muestra_activa]
+     Input('cambio-seleccion', 'data')],
+    [State('sesion', 'data')])
+def actualizar_grafico(columna_x, columna_y, x_axis_mode, y_axis_mode, checklist_regresion, cambio, sesion):
+    if cambio is None:
+        # El navegador aún no envía la selección; llega con su primer mensaje
+        raise dash.exceptions.PreventUpdate
 
+    with fase('datos'):
+        actual = estado()
+        activas = actual.selecciones.aplicar(sesion, cambio)
+        if activas is None:
+            # El servidor no conoce la selección de la sesión: se pide entera
+            return dash.no_update, {'n': cambio['n']}
+        df_filtrado = muestras(actual, activas, [columna_x, columna_y, 'err'])
+
+    with fase('figura'):
+        return figura_scatter(df_filtrado, columna_x, columna_y, x_axis_mode, y_axis_mode,
+                              checklist_regresion, activas, actual.regresion), dash.no_update
+
+
+def figura_scatter_px(df_filtrado, columna_x, columna_y, x_axis_mode, y_axis_mode, checklist_regresion, muestra_activa,
+                      regresion=None):
+    """
+    Scatter de las muestras activas con su línea de regresión, con Plotly
+    Express; ``regresion`` es la de la tabla vigente si no se indica
+    """
     scatter = px.scatter(df_filtrado, x=columna_x, y=columna_y,
                          hover_name=df_filtrado.index,
-                         hover_data={'err': True},
-                         trendline='ols' if checklist_regresion == 'Activado' else None,
+                         hover_data={'err': ':.2f'},
                          title='Gráfico de correlación bivariada',
-                         trendline_color_override='#ff8080',
                          )
 
+    # Línea de regresión a partir de los estadísticos precalculados
+    if checklist_regresion == 'Activado':
+        linea = (regresion or estado().regresion).linea(muestra_activa, columna_x, columna_y,
+                                                        log_x=x_axis_mode == 'Log', log_y=y_axis_mode == 'Log')
+        if linea is not None:
+            scatter.add_trace(go.Scatter(linea))
+
     scatter.update_layout(title_x=0.5)
 
     # Set tipo de 
@@ -148,5 +290,33 @@ def actualizar_grafico(columna_x, columna_y, x_axis_mode, y_axis_mode, checklist
     return scatter
 
 
+# Esqueletos del scatter por columnas y escalas de los ejes (figuras.py),
+# armados por px sin la línea de regresión
+esqueletos_scatter = Esqueletos(figura_scatter_px)
+
+
+def figura_scatter(df_filtrado, columna_x, columna_y, x_axis_mode, y_axis_mode, checklist_regresion, muestra_activa,
+                   regresion=None):
+    """Scatter de las muestras activas con su línea de regresión, igual al de figura_scatter_px"""
+    esqueleto = esqueletos_scatter.get((columna_x, columna_y, x_axis_mode, y_axis_mode, forma(len(df_filtrado))),
+                                       df_filtrado, columna_x, columna_y, x_axis_mode, y_axis_mode,
+                                       'No activada', muestra_activa)
+    traza = {'x': df_filtrado[columna_x].to_numpy(),
+             'y': df_filtrado[columna_y].to_numpy(),
+             'hovertext': df_filtrado.index.to_numpy()}
+    if esqueleto['data'] and 'customdata' in esqueleto['data'][0]:
+        traza['customdata'] = df_filtrado[['err']].to_numpy()
+    scatter = llenar(esqueleto, [traza])
+
+    if checklist_regresion == 'Activado':
+        linea = (regresion or estado().regresion).linea(muestra_activa, columna_x, columna_y,
+                                                        log_x=x_axis_mode == 'Log', log_y=y_axis_mode == 'Log')
+        if linea is not None:
+            scatter['data'].append(dict(linea, type='scatter', line=dict(linea['line'], dash='dot', width=2)))
+
+    return scatter
+
+
 if __name__ == '__main__':
+    configurar_proceso()
     app.run_server(debug=False)
\ No newline at end of file
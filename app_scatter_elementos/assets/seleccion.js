@@ -0,0 +1,32 @@
+// Muestras activas: el primer mensaje lleva la selección entera y los
+// siguientes sólo lo que cambió desde el anterior, numerados. La lista con
+// la que se compara se guarda en 'seleccion-anterior', que nunca sale del
+// navegador. Si el servidor no conoce la sesión pide la selección entera a
+// través de 'pedido-seleccion'.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+	seleccion: {
+		cambio: function(value, pedido, anterior) {
+			const seleccion = value || [];
+			if (!anterior) {
+				// Carga de la página: la selección ya pasó por el filtro de error
+				return [{n: 0, todas: seleccion}, {n: 0, codigos: seleccion}];
+			}
+			const n = anterior.n + 1;
+			const triggered = window.dash_clientside.callback_context.triggered;
+			if (triggered.some(t => t.prop_id === 'pedido-seleccion.data')) {
+				return [{n: n, todas: seleccion}, {n: n, codigos: seleccion}];
+			}
+			const antes = new Set(anterior.codigos);
+			const ahora = new Set(seleccion);
+			return [
+				{
+					n: n,
+					agregar: seleccion.filter(codigo => !antes.has(codigo)),
+					quitar: anterior.codigos.filter(codigo => !ahora.has(codigo))
+				},
+				{n: n, codigos: seleccion}
+			];
+		}
+	}
+});
@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import geodatos
+
+# Peso equivalente (g/eq = masa molar / carga) de los iones mayores
+PESOS_EQUIVALENTES = {
+    'Ca': 40.078 / 2,
+    'Mg': 24.305 / 2,
+    'K': 39.098,
+    'Na': 22.990,
+    'Cl': 35.453,
+    'SO4': 96.06 / 2,
+    'HCO3': 61.017,
+    'CO3': 60.009 / 2,
+}
+CATIONES = ['Ca', 'Mg', 'K', 'Na']
+ANIONES = ['Cl', 'SO4', 'HCO3', 'CO3']
+IONES = CATIONES + ANIONES
+
+# Tabla derivada vigente en este proceso, con el sha256 del CSV de origen
+_derivadas = {}
+_lock = threading.Lock()
+
+
+def meq(mg_l, iones=IONES):
+    """
+    mg/L to meq/L: divides each column of ``mg_l`` (array of shape
+    (muestras, len(iones))) by the equivalent weight of its ion.
+    """
+    pesos = np.array([PESOS_EQUIVALENTES[ion] for ion in iones])
+    return np.asarray(mg_l, dtype='float64') / pesos
+
+
+def error_balance(cationes, aniones):
+    """
+    Charge-balance error (%) per sample, |Σcat - Σan| / (Σcat + Σan) * 100,
+    from meq/L arrays of shape (muestras, iones). Missing ions count as
+    zero; a sample without any ion gets NaN.
+    """
+    suma_cat = np.nansum(cationes, axis=1)
+    suma_an = np.nansum(aniones, axis=1)
+    total = suma_cat + suma_an
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, np.abs(suma_cat - suma_an) / total * 100, np.nan)
+
+
+def tabla_meq(df, clave='codigo'):
+    """
+    Major ions of ``df`` (mg/L) in meq/L plus their charge-balance error.
+
+    Returns
+    -------
+    DataFrame with ``clave``, one column per ion of ``IONES`` and ``err``
+    """
+    valores = meq(df[IONES].to_numpy(dtype='float64'))
+    n = len(CATIONES)
+    tabla = pd.DataFrame(valores, columns=IONES)
+    tabla.insert(0, clave, df[clave].to_numpy())
+    tabla['err'] = error_balance(valores[:, :n], valores[:, n:])
+    return tabla
+
+
+class IndiceError:
+    """
+    Samples sorted by their balance error, so thresholding is a binary
+    search instead of a scan and a copy of the table.
+
+    err: array-like of float
+        Error of each sample, in table order. NaN sorts last and never
+        passes a threshold.
+    """
+
+    def __init__(self, err):
+        err = np.asarray(err, dtype='float64')
+        self.orden = np.argsort(err, kind='stable')
+        self.err = err[self.orden]
+
+    def menores(self, umbral):
+        """Positions, in table order, of the samples with err < umbral."""
+        # Marcar el prefijo devuelve el orden de la tabla sin ordenar posiciones
+        mascara = np.zeros(len(self.orden), dtype=bool)
+        mascara[self.orden[:np.searchsorted(self.err, umbral, 'left')]] = True
+        return np.flatnonzero(mascara)
+
+
+def cargar(tabla='geoquimica'):
+    """
+    Derived table of ``tabla`` (see ``tabla_meq``) and its ``IndiceError``.
+
+    Derived once per process and version of the source CSV; every call
+    checks the version (a stat and a small JSON read), so callers that
+    call it per request see samples added to the CSV without a restart.
+    The same objects are returned while the version does not change.
+    """
+    version = geodatos.version(tabla)
+    with _lock:
+        derivada = _derivadas.get(tabla)
+        if derivada is None or derivada[0] != version:
+            meq_l = tabla_meq(geodatos.cargar(tabla))
+            derivada = _derivadas[tabla] = (version, meq_l, IndiceError(meq_l['err']))
+    return derivada[1:]
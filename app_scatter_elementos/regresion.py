@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+
+
+class RegresionOLS:
+    """
+    Ordinary least squares trendlines from precomputed sufficient statistics.
+
+    For every pair of numeric columns, both in linear and in log10 scale,
+    it keeps n, Σx, Σy, Σxy, Σx² and Σy² over the active samples, as four
+    matrices over the stacked [linear | log10] columns. Activating or
+    deactivating samples adds or subtracts only the rows that changed, and
+    a fit is then a handful of scalar operations, without statsmodels.
+
+    df: DataFrame
+        Samples, one per row.
+    clave: str
+        Column with the sample code used by ``muestras_activas``.
+    """
+
+    def __init__(self, df, clave='codigo'):
+        self.columnas = list(df.select_dtypes('number').columns)
+        self._indice = {columna: i for i, columna in enumerate(self.columnas)}
+        self._filas = {codigo: i for i, codigo in enumerate(df[clave])}
+
+        self._valores = df[self.columnas].to_numpy(dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log = np.where(self._valores > 0, np.log10(self._valores), np.nan)
+        z = np.hstack([self._valores, log])
+
+        # Un valor faltante (o no positivo en log) no aporta a ningún par
+        self._validos = np.isfinite(z)
+        self._z = np.where(self._validos, z, 0.0)
+        self._z2 = self._z ** 2
+
+        k = z.shape[1]
+        self._n = np.zeros((k, k))
+        self._sx = np.zeros((k, k))
+        self._sxy = np.zeros((k, k))
+        self._sx2 = np.zeros((k, k))
+        self._activas = np.zeros(len(df), dtype=bool)
+        self._lock = threading.Lock()
+
+        self._aplicar(np.arange(len(df)), 1)
+        self._activas[:] = True
+
+    def _aplicar(self, filas, signo):
+        """Add (signo=1) or subtract (signo=-1) the rows' contributions."""
+        m = self._validos[filas].astype('float64')
+        z = self._z[filas]
+        self._n += signo * (m.T @ m)
+        self._sx += signo * (z.T @ m)
+        self._sxy += signo * (z.T @ z)
+        self._sx2 += signo * (self._z2[filas].T @ m)
+
+    def _activar(self, codigos):
+        if isinstance(codigos, np.ndarray) and codigos.dtype == bool:
+            nuevas = codigos.copy()
+        else:
+            nuevas = np.zeros_like(self._activas)
+            if codigos is not None:
+                nuevas[[self._filas[c] for c in codigos if c in self._filas]] = True
+
+        entran = np.flatnonzero(nuevas & ~self._activas)
+        salen = np.flatnonzero(self._activas & ~nuevas)
+        if len(entran) + len(salen) > len(nuevas) // 2:
+            # Cambio grande: más barato (y sin error acumulado) recalcular
+            for matriz in (self._n, self._sx, self._sxy, self._sx2):
+                matriz[:] = 0.0
+            self._aplicar(np.flatnonzero(nuevas), 1)
+        else:
+            self._aplicar(entran, 1)
+            self._aplicar(salen, -1)
+        self._activas = nuevas
+
+    def _columna(self, columna, log):
+        return self._indice[columna] + (len(self.columnas) if log else 0)
+
+    def ajuste(self, x, y, log_x=False, log_y=False):
+        """
+        Fit y = pendiente * x + intercepto over the active samples, in log10
+        scale for the axes flagged as log.
+
+        Returns
+        -------
+        Tuple (pendiente, intercepto, r2, n), or None if it cannot be fitted
+        """
+        i, j = self._columna(x, log_x), self._columna(y, log_y)
+        n = self._n[i, j]
+        sx, sy = self._sx[i, j], self._sx[j, i]
+        sxy, sx2, sy2 = self._sxy[i, j], self._sx2[i, j], self._sx2[j, i]
+
+        sxx = n * sx2 - sx ** 2
+        syy = n * sy2 - sy ** 2
+        if n < 2 or sxx <= 1e-12 * max(1.0, n * sx2):
+            return None
+
+        cov = n * sxy - sx * sy
+        pendiente = cov / sxx
+        intercepto = (sy - pendiente * sx) / n
+        r2 = cov ** 2 / (sxx * syy) if syy > 0 else 1.0
+        return pendiente, intercepto, r2, int(round(n))
+
+    def linea(self, codigos, x, y, log_x=False, log_y=False, color='#ff8080'):
+        """
+        Trendline trace for the samples in ``codigos`` (sample codes, or a
+        boolean mask over the rows), in the same format as Plotly Express'
+        ``trendline='ols'``.
+
+        Returns
+        -------
+        dict of go.Scatter properties, or None if there is no fit
+        """
+        if x not in self._indice or y not in self._indice:
+            return None
+
+        with self._lock:
+            self._activar(codigos)
+            ajuste = self.ajuste(x, y, log_x, log_y)
+            if ajuste is None:
+                return None
+            i, j = self._columna(x, log_x), self._columna(y, log_y)
+            filas = np.flatnonzero(self._activas & self._validos[:, i] & self._validos[:, j])
+
+        pendiente, intercepto, r2, _ = ajuste
+        xs = np.sort(self._valores[filas, self._indice[x]])
+        tx = np.log10(xs) if log_x else xs
+        ty = pendiente * tx + intercepto
+        ys = 10 ** ty if log_y else ty
+
+        nombre_x = f"log10({x})" if log_x else x
+        nombre_y = f"log10({y})" if log_y else y
+        return {
+            'x': xs,
+            'y': ys,
+            'mode': 'lines',
+            'name': '',
+            'showlegend': False,
+            'line': {'color': color},
+            'hovertemplate': (f"<b>OLS trendline</b><br>{nombre_y} = {pendiente:g} * {nombre_x} + {intercepto:g}"
+                              f"<br>R<sup>2</sup>={r2:g}<br><br>{x}=%{{x}}<br>{y}=%{{y}} <b>(trend)</b><extra></extra>")
+        }
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# flock sólo existe en POSIX; en Windows queda sólo el lock entre hilos
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Sesiones recordadas; al pasarse se olvida la menos reciente
+MAX_SESIONES = 1000
+
+# Bytes de la firma de la tabla y del número de mensaje al inicio de cada archivo
+_FIRMA = 16
+_NUMERO = 8
+
+
+class Selecciones:
+    """
+    Active samples of each browser session, kept on the server as a packed
+    bitmask over the rows of the table.
+
+    The browser does not send the selection with every callback, only what
+    changed since its previous message (see ``aplicar``), numbered
+    consecutively per session; its first message carries the whole
+    selection. If the session is unknown (the server was restarted, the
+    session was evicted or the table changed) or a message is missing,
+    ``aplicar`` returns None and the browser must send the whole selection
+    once.
+
+    With ``directorio`` the selections are files shared by every worker
+    process of the host, like the feeds of the earthquake app, so a
+    message can reach any gunicorn worker; each session is locked with
+    ``flock`` while a message is applied. Without it they are kept in this
+    process only, which needs sticky sessions with several workers.
+
+    codigos: array-like of str
+        Sample code of each row.
+    directorio: str
+        Folder for the shared selections, or None.
+    max_sesiones: int
+        Sessions kept; the least recently used one is dropped beyond it.
+    """
+
+    def __init__(self, codigos, directorio=None, max_sesiones=MAX_SESIONES):
+        self._filas = pd.Index(codigos)
+        self.n = len(self._filas)
+        self.directorio = directorio
+        self.max_sesiones = max_sesiones
+        # Las selecciones guardadas con otra tabla (otras filas) no se usan
+        self._firma = hashlib.blake2b('\n'.join(map(str, self._filas)).encode(), digest_size=_FIRMA).digest()
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+        if directorio:
+            os.makedirs(directorio, mode=0o700, exist_ok=True)
+
+    def filas(self, codigos):
+        """Rows of ``codigos``; unknown codes are skipped."""
+        if not codigos:
+            return np.empty(0, dtype='int64')
+        filas = self._filas.get_indexer_for(list(codigos))
+        return filas[filas >= 0]
+
+    def _mascara(self, bits):
+        return np.unpackbits(bits, count=self.n).astype(bool)
+
+    def aplicar(self, sesion, cambio):
+        """
+        Apply a message of the browser to the selection of ``sesion``.
+
+        cambio: dict
+            ``{'n': k, 'todas': [...]}`` with the whole selection (always
+            the first message of a session), ``{'n': k, 'agregar': [...],
+            'quitar': [...]}`` with the codes added and removed since
+            message k - 1, or ``{'n': k}`` with no changes. Messages already
+            applied (k not above the last one) leave it as it is.
+
+        Returns
+        -------
+        Boolean mask of the active rows, or None if the selection must be
+        sent whole
+        """
+        numero = cambio['n']
+        with self._bloqueo(sesion) as archivo:
+            actual = self._leer(sesion, archivo)
+            if actual is not None and numero <= actual[0]:
+                # Otro input disparó el callback, o llegó después de uno posterior
+                return self._mascara(actual[1])
+
+            if 'todas' in cambio:
+                mascara = np.zeros(self.n, dtype=bool)
+                mascara[self.filas(cambio['todas'])] = True
+            elif actual is None or numero != actual[0] + 1:
+                return None
+            else:
+                mascara = self._mascara(actual[1])
+                mascara[self.filas(cambio.get('agregar'))] = True
+                mascara[self.filas(cambio.get('quitar'))] = False
+
+            self._escribir(sesion, archivo, numero, np.packbits(mascara), nueva=actual is None)
+        return mascara
+
+    def _ruta(self, sesion):
+        # El id de sesión viene del navegador: el nombre del archivo es su hash
+        return os.path.join(self.directorio, hashlib.blake2b(str(sesion).encode(), digest_size=16).hexdigest())
+
+    @contextmanager
+    def _bloqueo(self, sesion):
+        """Exclusive access to ``sesion``; yields its open file descriptor, or None in memory."""
+        if not self.directorio:
+            with self._lock:
+                yield None
+            return
+
+        fd = os.open(self._ruta(sesion), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is None:
+                with self._lock:
+                    yield fd
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield fd
+        finally:
+            os.close(fd)
+
+    def _leer(self, sesion, archivo):
+        """(numero, bits) last stored for ``sesion``, or None."""
+        if archivo is None:
+            actual = self._sesiones.get(sesion)
+            if actual is not None:
+                self._sesiones.move_to_end(sesion)
+            return actual
+
+        tamaño = _FIRMA + _NUMERO + (self.n + 7) // 8
+        datos = os.pread(archivo, tamaño + 1, 0)
+        if len(datos) != tamaño or datos[:_FIRMA] != self._firma:
+            return None
+        # El mtime ordena las sesiones para descartar la menos reciente
+        os.utime(archivo)
+        numero = int.from_bytes(datos[_FIRMA:_FIRMA + _NUMERO], 'little', signed=True)
+        return numero, np.frombuffer(datos, dtype=np.uint8, offset=_FIRMA + _NUMERO)
+
+    def _escribir(self, sesion, archivo, numero, bits, nueva=False):
+        if archivo is None:
+            self._sesiones[sesion] = (numero, bits)
+            self._sesiones.move_to_end(sesion)
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+            return
+
+        datos = self._firma + numero.to_bytes(_NUMERO, 'little', signed=True) + bits.tobytes()
+        os.pwrite(archivo, datos, 0)
+        os.ftruncate(archivo, len(datos))
+        if nueva:
+            self._descartar_antiguas()
+
+    def _descartar_antiguas(self):
+        """Remove the least recently used session files beyond ``max_sesiones``."""
+        try:
+            archivos = [(entrada.stat().st_mtime_ns, entrada.path) for entrada in os.scandir(self.directorio)]
+        except OSError:
+            return
+        if len(archivos) <= self.max_sesiones:
+            return
+        archivos.sort()
+        for _, ruta in archivos[:len(archivos) - self.max_sesiones]:
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
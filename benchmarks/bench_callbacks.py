@@ -0,0 +1,283 @@
+"""
+Benchmark de los callbacks de las tres apps, llamados directamente (sin
+navegador ni HTTP) sobre datos sintéticos escalados desde las tablas del
+repo. La app de sismos descarga sus feeds de un stub local de la USGS.
+
+Por caso reporta latencia (p50, p90, p99), memoria máxima asignada durante
+una llamada (tracemalloc) y bytes de la respuesta serializada como la
+envía Dash. ``--guardar`` escribe los resultados en JSON junto con el
+commit actual y ``--comparar`` contrasta una corrida con uno de esos JSON.
+
+update_basemap ya no existe en el servidor: el cambio de basemap es un
+callback clientside (assets/basemap.js) y no se mide acá.
+
+Uso: python benchmarks/bench_callbacks.py [--tamaños 10000,100000] [--repeticiones N]
+                                          [--solo app] [--guardar [ruta]] [--comparar ruta]
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import dash
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+from stub_usgs import StubUSGS
+from synthetic import escalar_tabla, serie_caudal
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+TAMAÑOS = [10000, 100000]
+REPETICIONES = 20
+
+# Una caída mayor a esto frente al baseline se marca en la comparación
+UMBRAL_REGRESION = 1.2
+
+# Vista con zoom sobre el Pacífico: sin agregación, sólo marcadores visibles
+RELAYOUT_ZOOM = {'mapbox.center': {'lon': -150, 'lat': 0}, 'mapbox.zoom': 5}
+
+
+def cargar_app(carpeta):
+    """
+    Import ``carpeta/app.py`` as module ``<carpeta>.app`` with the app's
+    folder as working directory, as ``python app.py`` would, and wait for
+    its warm-up threads.
+    """
+    ruta = os.path.join(RAIZ, carpeta)
+    sys.path.insert(0, ruta)
+    anterior = os.getcwd()
+    os.chdir(ruta)
+    try:
+        spec = importlib.util.spec_from_file_location(f'{carpeta}.app', os.path.join(ruta, 'app.py'))
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = modulo
+        spec.loader.exec_module(modulo)
+    finally:
+        os.chdir(anterior)
+
+    for hilo in threading.enumerate():
+        if hilo.name.startswith('warm'):
+            hilo.join()
+    return modulo
+
+
+def bytes_respuesta(valor):
+    if isinstance(valor, (list, tuple)):
+        # Dash no envía las salidas sin cambios
+        valor = [v for v in valor if v is not dash.no_update]
+    return len(json.dumps(valor, cls=PlotlyJSONEncoder))
+
+
+def medir(fn, repeticiones, antes=None):
+    """
+    Returns
+    -------
+    dict with latency percentiles (ms), peak traced memory (KiB) and the
+    serialized size of the response
+    """
+    if antes:
+        antes()
+    respuesta = fn()  # calentamiento
+
+    tiempos = []
+    for _ in range(repeticiones):
+        if antes:
+            antes()
+        t = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t)
+
+    if antes:
+        antes()
+    tracemalloc.start()
+    fn()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(tiempos, [50, 90, 99]) * 1e3
+    return {'p50': p50, 'p90': p90, 'p99': p99, 'pico_kib': pico / 1024, 'bytes': bytes_respuesta(respuesta)}
+
+
+def casos_terremotos(tamaños):
+    """(nombre, n, fn, antes) of the earthquake app, fed by a stub USGS."""
+    stub = StubUSGS(n=tamaños[0]).start()
+    os.environ['USGS_FEED_URL'] = stub.url
+    os.environ['SISMOS_DB'] = os.path.join(tempfile.mkdtemp(), 'sismos.sqlite')
+    app = cargar_app('app_requests_terremotos')
+    utilities = sys.modules['utilities']
+    from event_store import EventStore
+    utilities.scheduler.stop()
+
+    update_map_mag = app.update_map_mag.__wrapped__
+    update_tabla = app.update_tabla.__wrapped__
+
+    for n in tamaños:
+        def preparar(n=n):
+            # Store vacío: el sync baja el feed del mes completo desde el stub
+            stub.set_feed(n)
+            utilities.feed_cache.clear()
+            utilities.scheduler.store = EventStore()
+            utilities.scheduler.sync()
+
+        preparar()
+        yield 'scheduler.sync (stub, mes)', n, utilities.scheduler.sync, preparar
+        yield 'update_map_mag 1.0/month', n, lambda: update_map_mag(1.0, 'month', None), None
+        yield 'update_map_mag 1.0/month zoom', n, lambda: update_map_mag(1.0, 'month', RELAYOUT_ZOOM), None
+        yield 'update_map_mag 4.5/day', n, lambda: update_map_mag(4.5, 'day', None), None
+        yield 'update_tabla filtro', n, lambda: update_tabla(1.0, 'month', 3, 15, [], '{mag} >= 2.5'), None
+
+    stub.stop()
+
+
+def casos_mapa(tamaños):
+    """(nombre, n, fn, antes) of the geochemistry and flow app."""
+    app = cargar_app('app_mapa_barras_caudales')
+    geoquimica, caudales = app.df, app.dict_dfs
+
+    for n in [None] + tamaños:
+        if n is None:
+            app.df, app.dict_dfs = geoquimica, caudales
+        else:
+            app.df = escalar_tabla(geoquimica, n, clave='codigo')
+            app.dict_dfs = {nombre: serie_caudal(n, seed=i) for i, nombre in enumerate(app.nombres_caudales)}
+        app.cache_figuras.clear()
+
+        codigo = app.df.codigo.iloc[-1]
+        hover_barras = {'points': [{'customdata': [codigo]}]}
+        hover_caudales = {'points': [{'customdata': ['Baroa Bajo']}]}
+        etiqueta = len(app.df) if n is None else n
+
+        yield 'update_barras (frío)', etiqueta, lambda: app.update_barras(hover_barras, 'plotly'), app.cache_figuras.clear
+        yield 'update_barras (cache)', etiqueta, lambda: app.update_barras(hover_barras, 'plotly'), None
+        etiqueta = len(caudales['Baroa Bajo']) if n is None else n
+        yield 'update_caudales (frío)', etiqueta, lambda: app.update_caudales(hover_caudales, 'plotly'), app.cache_figuras.clear
+        yield 'update_caudales (cache)', etiqueta, lambda: app.update_caudales(hover_caudales, 'plotly'), None
+
+        # Zoom sobre un 5% de la serie, al medio
+        fechas = app.dict_dfs['Baroa Bajo']['Fecha']
+        medio, ancho = len(fechas) // 2, max(len(fechas) // 20, 1)
+        zoom = {'xaxis.range[0]': str(fechas.iloc[medio]), 'xaxis.range[1]': str(fechas.iloc[medio + ancho])}
+        yield 'update_caudales zoom', etiqueta, lambda: app.update_caudales(hover_caudales, 'plotly', zoom), None
+
+    app.df, app.dict_dfs = geoquimica, caudales
+
+
+def casos_scatter(tamaños):
+    """(nombre, n, fn, antes) of the scatter app."""
+    os.environ['SELECCIONES_DIR'] = tempfile.mkdtemp()
+    app = cargar_app('app_scatter_elementos')
+    estado = app.estado
+    import geodatos  # en el path desde que se cargó la app
+    geoquimica = geodatos.cargar('geoquimica')
+
+    filtrar_df = app.filtrar_df.__wrapped__
+    actualizar_grafico = app.actualizar_grafico.__wrapped__
+
+    for n in [None] + tamaños:
+        # Muestras en mg/L, de las que se derivan meq/L y error como al cargar la app
+        if n is not None:
+            df = app.hidroquimica.tabla_meq(escalar_tabla(geoquimica, n, clave='codigo'))
+            escalado = app.armar_estado(df, app.hidroquimica.IndiceError(df['err']))
+            app.estado = lambda e=escalado: e
+        muestras = list(app.estado().df_elementos['codigo'])
+        etiqueta = len(muestras)
+        sesion = f'bench-{etiqueta}'
+
+        def alternar(mensajes=iter(range(1, 1 << 30))):
+            # Saca y vuelve a poner la primera muestra, como en el dropdown
+            numero = next(mensajes)
+            cambio = {'n': numero, 'quitar' if numero % 2 else 'agregar': muestras[:1]}
+            return actualizar_grafico('Cl', 'Na', 'Linear', 'Linear', 'Activado', cambio, sesion)
+
+        # Primer mensaje de la sesión, con todas las muestras; repetido sólo
+        # cambian los otros inputs
+        inicio = {'n': 0, 'todas': muestras}
+        yield 'filtrar_df', etiqueta, lambda: filtrar_df(30), None
+        yield 'actualizar_grafico', etiqueta, lambda: actualizar_grafico(
+            'Cl', 'Na', 'Linear', 'Linear', 'Activado', inicio, sesion), None
+        yield 'actualizar_grafico log', etiqueta, lambda: actualizar_grafico(
+            'Cl', 'Na', 'Log', 'Log', 'Activado', inicio, sesion), None
+        yield 'actualizar_grafico muestra', etiqueta, alternar, None
+
+    app.estado = estado
+
+
+APPS = {
+    'terremotos': casos_terremotos,
+    'mapa': casos_mapa,
+    'scatter': casos_scatter,
+}
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(resultados, ruta):
+    with open(ruta) as f:
+        base = json.load(f)
+    print(f"\nComparación con {ruta} (commit {base.get('commit')})")
+    print(f"{'caso':<52} {'p50':>9} {'bytes':>9}")
+    for clave, actual in resultados.items():
+        anterior = base['casos'].get(clave)
+        if anterior is None:
+            continue
+        razon = actual['p50'] / anterior['p50'] if anterior['p50'] else float('nan')
+        bytes_razon = actual['bytes'] / anterior['bytes'] if anterior['bytes'] else float('nan')
+        marca = '  REGRESIÓN' if razon > UMBRAL_REGRESION else ''
+        print(f"{clave:<52} {razon:8.2f}x {bytes_razon:8.2f}x{marca}")
+
+
+def opcion(argv, nombre, defecto=None, sin_valor=None):
+    if nombre not in argv:
+        return defecto
+    i = argv.index(nombre)
+    if i + 1 >= len(argv) or argv[i + 1].startswith('--'):
+        del argv[i]
+        return sin_valor
+    valor = argv[i + 1]
+    del argv[i:i + 2]
+    return valor
+
+
+def main(argv):
+    tamaños = [int(n) for n in opcion(argv, '--tamaños', ','.join(map(str, TAMAÑOS))).split(',')]
+    repeticiones = int(opcion(argv, '--repeticiones', REPETICIONES))
+    solo = opcion(argv, '--solo')
+    guardar = opcion(argv, '--guardar', sin_valor=BASELINE)
+    ruta_comparar = opcion(argv, '--comparar', sin_valor=BASELINE)
+
+    resultados = {}
+    print(f"{'app':<11} {'caso':<30} {'n':>8} {'p50':>10} {'p90':>10} {'p99':>10} {'pico':>10} {'bytes':>10}")
+    for nombre_app, casos in APPS.items():
+        if solo and nombre_app != solo:
+            continue
+        for caso, n, fn, antes in casos(tamaños):
+            r = medir(fn, repeticiones, antes)
+            resultados[f'{nombre_app}/{caso}/{n}'] = r
+            print(f"{nombre_app:<11} {caso:<30} {n:>8} {r['p50']:6.3f} ms {r['p90']:6.3f} ms "
+                  f"{r['p99']:6.3f} ms {r['pico_kib']:6.0f} KiB {r['bytes']:>10}", flush=True)
+
+    if guardar:
+        with open(guardar, 'w') as f:
+            json.dump({'commit': commit_actual(), 'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'python': sys.version.split()[0], 'tamaños': tamaños,
+                       'repeticiones': repeticiones, 'casos': resultados}, f, indent=1)
+        print(f"\nResultados guardados en {guardar}")
+    if ruta_comparar:
+        comparar(resultados, ruta_comparar)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
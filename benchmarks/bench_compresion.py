@@ -0,0 +1,88 @@
+"""
+Bytes en la red y CPU por request de la compresión de respuestas
+(compresion.py) para cada callback de bench_callbacks.py.
+
+Por caso reporta el tamaño de la respuesta sin comprimir, con gzip (el
+nivel que usa Dash por defecto) y con brotli, el CPU de comprimirla con
+cada uno, y el de servirla desde el cache de cuerpos comprimidos: lo que
+paga cada request que repite una respuesta ya comprimida. Las respuestas
+menores a compresion.MIN_BYTES salen sin comprimir.
+
+Uso: python benchmarks/bench_compresion.py [--tamaños 10000,100000] [--solo app]
+"""
+import json
+import os
+import sys
+import time
+
+import dash
+from plotly.utils import PlotlyJSONEncoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import compresion  # noqa: E402
+from bench_callbacks import APPS, opcion  # noqa: E402
+
+TAMAÑOS = [10000]
+
+
+def cuerpo(respuesta):
+    """Body of a callback response, as Dash serializes it."""
+    if isinstance(respuesta, (list, tuple)):
+        # Dash no envía las salidas sin cambios
+        respuesta = [v for v in respuesta if v is not dash.no_update]
+    return json.dumps({'response': respuesta, 'multi': True}, cls=PlotlyJSONEncoder).encode()
+
+
+def cpu(fn, minimo=0.2):
+    """Best CPU time (s) per call of ``fn`` over repeated runs."""
+    mejores = []
+    for _ in range(3):
+        n, inicio = 0, time.process_time()
+        while True:
+            fn()
+            n += 1
+            transcurrido = time.process_time() - inicio
+            if transcurrido >= minimo / 3:
+                break
+        mejores.append(transcurrido / n)
+    return min(mejores)
+
+
+def main(argv):
+    tamaños = [int(n) for n in opcion(argv, '--tamaños', ','.join(map(str, TAMAÑOS))).split(',')]
+    solo = opcion(argv, '--solo')
+
+    print(f"{'app':<11} {'caso':<30} {'n':>7} {'crudo':>10} {'gzip':>9} {'br':>9} "
+          f"{'cpu gzip':>10} {'cpu br':>10} {'cpu cache':>10}")
+    total_crudo = total_br = 0
+    for nombre_app, casos in APPS.items():
+        if solo and nombre_app != solo:
+            continue
+        for caso, n, fn, antes in casos(tamaños):
+            if antes:
+                antes()
+            datos = cuerpo(fn())
+            fila = f"{nombre_app:<11} {caso:<30} {n:>7} {len(datos):>10}"
+            if len(datos) < compresion.MIN_BYTES:
+                print(f"{fila} {'(sin comprimir: menor a MIN_BYTES)':>51}", flush=True)
+                continue
+
+            gz = compresion.comprimir(datos, 'gzip')
+            br = compresion.comprimir(datos, 'br')
+            cache = compresion.CacheComprimidas()
+            compresion.cuerpo_comprimido(datos, 'br', cache)
+            t_gzip = cpu(lambda: compresion.comprimir(datos, 'gzip'))
+            t_br = cpu(lambda: compresion.comprimir(datos, 'br'))
+            t_cache = cpu(lambda: compresion.cuerpo_comprimido(datos, 'br', cache))
+            total_crudo += len(datos)
+            total_br += len(br)
+            print(f"{fila} {len(gz):>9} {len(br):>9} {t_gzip * 1e3:7.3f} ms {t_br * 1e3:7.3f} ms "
+                  f"{t_cache * 1e3:7.3f} ms", flush=True)
+
+    if total_crudo:
+        print(f"\nbrotli: {total_br / total_crudo:.1%} de los bytes sin comprimir")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
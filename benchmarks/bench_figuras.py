@@ -0,0 +1,88 @@
+"""
+Figuras rellenadas desde un esqueleto (figuras.py) contra las de Plotly
+Express que reemplazan, en las funciones de los callbacks calientes:
+plot_map, figura_barras (update_barras), figura_caudales (update_caudales)
+y figura_scatter (actualizar_grafico).
+
+Por caso mide el costo por llamada de cada una; que las dos figuras
+serializan al mismo JSON lo comprueba tests/test_figuras.py sobre estos
+mismos casos.
+
+Uso: python benchmarks/bench_figuras.py [n ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app_requests_terremotos'))
+os.environ.setdefault('SISMOS_DB', os.path.join(tempfile.mkdtemp(), 'sismos.sqlite'))
+
+import spatial  # noqa: E402
+import utilities  # noqa: E402
+from bench_callbacks import RELAYOUT_ZOOM, cargar_app  # noqa: E402
+from geojson_parser import parse_feed  # noqa: E402
+from synthetic import escalar_tabla, feed_bytes, serie_caudal  # noqa: E402
+
+
+def casos(tamaños):
+    """(nombre, fn con Plotly Express, fn con esqueleto) of every hot figure."""
+    for n in [300] + tamaños:
+        df = parse_feed(feed_bytes(n))
+        for nombre, relayout in (('', None), (' zoom', RELAYOUT_ZOOM)):
+            visibles, agregado = spatial.visible_events(df, relayout)
+            yield (f'plot_map {n}{nombre}' + (' (bins)' if agregado else ''),
+                   lambda v=visibles, a=agregado: utilities.plot_map_px(v, a),
+                   lambda r=relayout: utilities.plot_map(df, r))
+    vacio = parse_feed(feed_bytes(0))
+    yield 'plot_map vacío', lambda: utilities.plot_map_px(vacio, False), lambda: utilities.plot_map(vacio)
+
+    mapa = cargar_app('app_mapa_barras_caudales')
+    for estilo in mapa.lista_templates:
+        for codigo in mapa.df.codigo:
+            yield (f'figura_barras {codigo} {estilo}', lambda c=codigo, e=estilo: mapa.figura_barras_px(c, e),
+                   lambda c=codigo, e=estilo: mapa.figura_barras(c, e))
+        for nombre in mapa.nombres_caudales:
+            yield (f'figura_caudales {nombre} {estilo}', lambda v=nombre, e=estilo: mapa.figura_caudales_px(v, e),
+                   lambda v=nombre, e=estilo: mapa.figura_caudales(v, e))
+    for n in tamaños:
+        mapa.dict_dfs = {'Baroa Bajo': serie_caudal(n)}
+        yield (f'figura_caudales {n}', lambda: mapa.figura_caudales_px('Baroa Bajo', 'plotly'),
+               lambda: mapa.figura_caudales('Baroa Bajo', 'plotly'))
+
+    scatter = cargar_app('app_scatter_elementos')
+    ejes = [('Cl', 'Na', 'Linear', 'Linear'), ('Cl', 'Na', 'Log', 'Log'), ('HCO3', 'Ca', 'Linear', 'Log'),
+            ('err', 'Na', 'Linear', 'Linear'), ('Mg', 'Mg', 'Linear', 'Linear')]
+    for n in [None] + tamaños:
+        df_elementos = scatter.estado().df_elementos
+        df = df_elementos if n is None else escalar_tabla(df_elementos, n, clave='codigo')
+        df = df.set_index('codigo')
+        muestras = list(df.index)
+        for x, y, modo_x, modo_y in ejes:
+            for regresion in ('Activado', 'No activada'):
+                yield (f'figura_scatter {len(df)} {x}/{y} {modo_x}/{modo_y} {regresion}',
+                       lambda *a: scatter.figura_scatter_px(*a), lambda *a: scatter.figura_scatter(*a),
+                       (df, x, y, modo_x, modo_y, regresion, muestras))
+        # Muestras filtradas: la figura vacía y una sola muestra
+        for filas in (0, 1):
+            yield (f'figura_scatter {filas} muestras', lambda *a: scatter.figura_scatter_px(*a),
+                   lambda *a: scatter.figura_scatter(*a),
+                   (df.iloc[:filas], 'Cl', 'Na', 'Linear', 'Linear', 'Activado', muestras[:filas]))
+
+
+def bench(fn, number=5):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main(tamaños):
+    print(f"{'figura':<58} {'t px':>10} {'t esqueleto':>12} {'razón':>7}")
+    for nombre, con_px, con_esqueleto, *args in casos(tamaños):
+        args = args[0] if args else ()
+        t_px = bench(lambda: con_px(*args))
+        t_esqueleto = bench(lambda: con_esqueleto(*args))
+        print(f"{nombre:<58} {t_px * 1e3:7.2f} ms {t_esqueleto * 1e3:9.3f} ms {t_px / t_esqueleto:6.0f}x", flush=True)
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000])
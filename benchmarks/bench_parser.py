@@ -0,0 +1,54 @@
+"""
+Benchmark del parser de feeds USGS: json_normalize + apply(pd.Series)
+contra el parser columnar de ``geojson_parser``.
+
+Uso: python benchmarks/bench_parser.py [n ...]
+"""
+import json
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app_requests_terremotos'))
+
+import geojson_parser  # noqa: E402
+from synthetic import feed_bytes  # noqa: E402
+
+
+def parse_json_normalize(content):
+    """Parser original de get_earthquake_df."""
+    df = pd.json_normalize(data=json.loads(content), record_path='features', errors='ignore')
+    df.columns = df.columns.str.replace('properties.', '', regex=False)
+    df.columns = df.columns.str.replace('geometry.', '', regex=False)
+    df = df[['mag', 'place', 'time', 'tz', 'type', 'title', 'coordinates']]
+    df['time'] = pd.to_datetime(df['time'], unit='ms', origin='unix')
+    df_geometry = df['coordinates'].apply(pd.Series)
+    df_geometry = df_geometry.rename(columns={0: 'lon', 1: 'lat', 2: 'depth'})
+    return df.join(df_geometry)
+
+
+def bench(fn, content, repeat=3):
+    number = 1
+    return min(timeit.repeat(lambda: fn(content), number=number, repeat=repeat)) / number
+
+
+def main(sizes):
+    parsers = [('json_normalize', parse_json_normalize),
+               ('columnar', geojson_parser.parse_feed)]
+    if geojson_parser.ijson is not None:
+        parsers.append(('columnar-stream',
+                        lambda content: geojson_parser.parse_feed(content, streaming=True)))
+
+    decoder = 'orjson' if geojson_parser.orjson is not None else 'json'
+    print(f"decoder: {decoder}")
+    print(f"{'features':>9} {'MB':>7} " + ' '.join(f"{name:>16}" for name, _ in parsers))
+    for n in sizes:
+        content = feed_bytes(n)
+        tiempos = [bench(fn, content) for _, fn in parsers]
+        print(f"{n:>9} {len(content) / 1e6:>7.1f} " + ' '.join(f"{t * 1e3:>13.1f} ms" for t in tiempos))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,82 @@
+"""
+Memoria de servir las tres apps como procesos separados frente a
+``portal.py``, que las monta en un solo proceso y las carga al primer
+request.
+
+Cada configuración corre en procesos nuevos que piden el layout de las
+páginas visitadas, esperan los precalentados y reportan su memoria
+residente (VmRSS, sólo Linux). La app de sismos descarga sus feeds de un
+stub local de la USGS.
+
+Uso: python benchmarks/bench_portal.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from stub_usgs import StubUSGS
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Se ejecuta dentro de cada proceso: argv = modo, rutas visitadas
+MEDICION = """
+import json, os, sys, threading
+sys.path.insert(0, {raiz!r})
+sys.path.insert(0, os.path.join({raiz!r}, 'benchmarks'))
+
+modo, rutas = sys.argv[1], sys.argv[2:]
+if modo == 'portal':
+    from werkzeug.test import Client
+    import portal
+    cliente = Client(portal.server)
+    cliente.get('/')
+    for ruta in rutas:
+        assert cliente.get(f'/{{ruta}}/_dash-layout').status_code == 200
+else:
+    from bench_callbacks import cargar_app
+    app = cargar_app(rutas[0])
+    assert app.app.server.test_client().get('/_dash-layout').status_code == 200
+
+for hilo in threading.enumerate():
+    if hilo.name.startswith('warm'):
+        hilo.join()
+with open('/proc/self/status') as f:
+    rss = next(int(linea.split()[1]) for linea in f if linea.startswith('VmRSS'))
+print(json.dumps({{'rss_mib': rss / 1024}}))
+"""
+
+
+def medir(modo, rutas, env):
+    salida = subprocess.run([sys.executable, '-c', MEDICION.format(raiz=RAIZ), modo] + rutas,
+                            capture_output=True, text=True, env=env, cwd=RAIZ)
+    if salida.returncode:
+        raise RuntimeError(salida.stderr)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from portal import PAGINAS
+
+    with StubUSGS(n=10000) as stub:
+        env = dict(os.environ, USGS_FEED_URL=stub.url,
+                   SISMOS_DB=os.path.join(tempfile.mkdtemp(), 'sismos.sqlite'))
+
+        print(f"{'configuración':<46} {'procesos':>8} {'RSS':>10}")
+        total = 0
+        for ruta, (carpeta, _) in PAGINAS.items():
+            r = medir('separada', [carpeta], env)
+            total += r['rss_mib']
+            print(f"{'app sola: ' + ruta:<46} {1:>8} {r['rss_mib']:6.0f} MiB")
+        print(f"{'tres apps separadas':<46} {len(PAGINAS):>8} {total:6.0f} MiB")
+
+        for visitadas in ([], ['scatter'], list(PAGINAS)):
+            r = medir('portal', visitadas, env)
+            nombre = f"portal, visitadas: {', '.join(visitadas) or 'ninguna'}"
+            print(f"{nombre:<46} {1:>8} {r['rss_mib']:6.0f} MiB")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, RAIZ)
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark de la serialización compacta (serializacion.py) contra la de
+Dash (json + PlotlyJSONEncoder) sobre las figuras de las apps: bytes,
+tiempo de codificación y error máximo introducido por el redondeo.
+
+Uso: python benchmarks/bench_serializacion.py [n ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app_requests_terremotos'))
+os.environ.setdefault('SISMOS_DB', os.path.join(tempfile.mkdtemp(), 'sismos.sqlite'))
+
+import serializacion  # noqa: E402
+import utilities  # noqa: E402
+from bench_callbacks import RELAYOUT_ZOOM, cargar_app  # noqa: E402
+from geojson_parser import parse_feed  # noqa: E402
+from synthetic import escalar_tabla, feed_bytes, serie_caudal  # noqa: E402
+
+
+def estandar(figura):
+    return json.dumps(figura, cls=PlotlyJSONEncoder)
+
+
+def error_maximo(original, compacto):
+    """
+    Largest absolute error on lat/lon and largest relative error on the
+    other numeric arrays of the traces, after decoding both encodings.
+    """
+    err_coord = err_rel = 0.0
+    for a, b in zip(json.loads(original)['data'], json.loads(compacto)['data']):
+        pendientes = [(a, b)]
+        while pendientes:
+            x, y = pendientes.pop()
+            for clave, valor in x.items():
+                if isinstance(valor, dict) and isinstance(y.get(clave), dict):
+                    pendientes.append((valor, y[clave]))
+                elif isinstance(valor, list) and valor and all(isinstance(v, (int, float)) or v is None for v in valor):
+                    u = np.array(valor, dtype='float64')
+                    v = np.array(y[clave], dtype='float64')
+                    ok = np.isfinite(u)
+                    if not ok.any():
+                        continue
+                    if clave in serializacion.COORDENADAS:
+                        err_coord = max(err_coord, np.abs(u[ok] - v[ok]).max())
+                    else:
+                        escala = np.where(u[ok] != 0, np.abs(u[ok]), 1)
+                        err_rel = max(err_rel, (np.abs(u[ok] - v[ok]) / escala).max())
+    return err_coord, err_rel
+
+
+def figuras(tamaños):
+    """(nombre, figura) of every app at each size."""
+    for n in tamaños:
+        df = parse_feed(feed_bytes(n))
+        yield f'plot_map {n} agregado', utilities.plot_map(df)
+        yield f'plot_map {n} zoom', utilities.plot_map(df, RELAYOUT_ZOOM)
+
+    mapa = cargar_app('app_mapa_barras_caudales')
+    yield 'figura_mapa', mapa.figura_mapa()
+    yield 'figura_mapa_2', mapa.figura_mapa_2()
+    yield 'figura_barras', mapa.figura_barras('PT01', 'plotly')
+    for n in tamaños:
+        mapa.dict_dfs = {'Baroa Bajo': serie_caudal(n)}
+        yield f'figura_caudales {n}', mapa.figura_caudales('Baroa Bajo', 'plotly')
+
+    scatter = cargar_app('app_scatter_elementos')
+    for n in tamaños:
+        df = escalar_tabla(scatter.df_elementos, n, clave='codigo').set_index('codigo')
+        yield f'figura_scatter {n}', scatter.figura_scatter(df, 'Cl', 'Na', 'Linear', 'Linear',
+                                                            'Activado', list(df.index))
+
+
+def bench(fn, number=5):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main(tamaños):
+    print(f"{'figura':<28} {'bytes':>10} {'compacto':>10} {'ahorro':>7} "
+          f"{'t json':>10} {'t compacto':>11} {'err lat/lon':>12} {'err rel':>9}")
+    for nombre, figura in figuras(tamaños):
+        original, compacto = estandar(figura), serializacion.dumps(figura)
+        t_original = bench(lambda: estandar(figura))
+        t_compacto = bench(lambda: serializacion.dumps(figura))
+        err_coord, err_rel = error_maximo(original, compacto)
+        print(f"{nombre:<28} {len(original):>10} {len(compacto):>10} {1 - len(compacto) / len(original):6.0%} "
+              f"{t_original * 1e3:7.2f} ms {t_compacto * 1e3:8.2f} ms {err_coord:12.1e} {err_rel:9.1e}")
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000])
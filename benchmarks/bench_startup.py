@@ -0,0 +1,118 @@
+"""
+Perfil de arranque de las apps: tiempo de importación de ``app.py``, los
+imports que más pesan (``python -X importtime``) y la latencia del primer
+layout servido, que es donde ahora se arman las figuras iniciales.
+
+Cada app se importa en un proceso nuevo, con su carpeta como directorio de
+trabajo, igual que al correrla con ``python app.py``. Los hilos que la app
+lanza al importarse (precalentado de figuras, scheduler) se inician recién
+después de medir el import: ``-X importtime`` no distingue hilos y
+mezclaría sus imports con los de la app. Con ``--espera S`` se les dan S
+segundos antes de pedir el primer layout.
+
+Uso: python benchmarks/bench_startup.py [--top N] [--espera S] [app ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+APPS = ['app_requests_terremotos', 'app_mapa_barras_caudales', 'app_scatter_elementos']
+
+# Se ejecuta dentro del proceso de cada app
+MEDICION = """
+import json, sys, threading, time
+
+pendientes = []
+iniciar = threading.Thread.start
+threading.Thread.start = lambda hilo: pendientes.append(hilo)
+
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter() - t0
+
+threading.Thread.start = iniciar
+for hilo in pendientes:
+    hilo.start()
+time.sleep(float(sys.argv[1]))
+
+client = app.app.server.test_client()
+tiempos = {}
+for ruta in ('/', '/_dash-layout', '/_dash-layout'):
+    t = time.perf_counter()
+    respuesta = client.get(ruta)
+    tiempos.setdefault(ruta, []).append((time.perf_counter() - t, len(respuesta.data)))
+print(json.dumps({'import': t_import, 'rutas': tiempos}))
+"""
+
+
+def parsear_importtime(stderr):
+    """
+    Lines of ``-X importtime`` as (self_us, cumulative_us, depth, module),
+    depth 0 being the modules imported directly by the ``-c`` script.
+    """
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith('import time:') or 'imported package' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        profundidad = (len(nombre) - len(nombre.lstrip(' ')) - 1) // 2
+        filas.append((int(propio), int(acumulado), profundidad, nombre.strip()))
+    return filas
+
+
+def perfilar(nombre_app, espera=0.0):
+    env = dict(os.environ)
+    # La app de sismos no debe tocar el histórico real al perfilarse
+    env.setdefault('SISMOS_DB', os.path.join(tempfile.mkdtemp(), 'sismos.sqlite'))
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', MEDICION, str(espera)],
+                             cwd=os.path.join(RAIZ, nombre_app), env=env,
+                             capture_output=True, text=True)
+    if proceso.returncode != 0:
+        return None, proceso.stderr.strip().splitlines()[-1:]
+    return json.loads(proceso.stdout.strip().splitlines()[-1]), parsear_importtime(proceso.stderr)
+
+
+def reporte(nombre_app, top=10, espera=0.0):
+    medicion, filas = perfilar(nombre_app, espera)
+    print(f"\n== {nombre_app}")
+    if medicion is None:
+        print(f"  falló: {' '.join(filas)}")
+        return
+
+    print(f"  {'import app.py':<24} {medicion['import'] * 1e3:9.1f} ms")
+    for ruta, respuestas in medicion['rutas'].items():
+        for i, (t, size) in enumerate(respuestas):
+            etiqueta = f"GET {ruta}" + (' (2ª)' if i else '')
+            print(f"  {etiqueta:<24} {t * 1e3:9.1f} ms {size:>9} bytes")
+
+    # Imports hechos directamente por app.py, por tiempo acumulado
+    app_propio = next((propio for propio, _, prof, mod in filas if prof == 0 and mod == 'app'), 0)
+    directos = sorted((f for f in filas if f[2] == 1), key=lambda f: -f[1])
+    print(f"  {'módulo':<36} {'acumulado':>10} {'propio':>9}")
+    print(f"  {'app (cuerpo)':<36} {'':>10} {app_propio / 1e3:6.1f} ms")
+    for propio, acumulado, _, modulo in directos[:top]:
+        print(f"  {modulo:<36} {acumulado / 1e3:7.1f} ms {propio / 1e3:6.1f} ms")
+
+
+def opcion(argv, nombre, defecto):
+    if nombre not in argv:
+        return defecto
+    i = argv.index(nombre)
+    valor = argv[i + 1]
+    del argv[i:i + 2]
+    return type(defecto)(valor)
+
+
+def main(argv):
+    top = opcion(argv, '--top', 10)
+    espera = opcion(argv, '--espera', 0.0)
+    for nombre_app in argv or APPS:
+        reporte(nombre_app, top, espera)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
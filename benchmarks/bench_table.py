@@ -0,0 +1,53 @@
+"""
+Benchmark de la tabla de sismos: bytes y latencia de la respuesta con
+paginado nativo (todas las filas) contra paginado en el servidor.
+
+Uso: python benchmarks/bench_table.py [n ...]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app_requests_terremotos'))
+
+import table_index  # noqa: E402
+from geojson_parser import parse_feed  # noqa: E402
+from synthetic import feed_bytes  # noqa: E402
+
+
+def respuesta_nativa(df):
+    """Datos que enviaba plot_table con page_action='native'."""
+    data = df[['place', 'mag']].sort_values(by='mag', ascending=False).to_dict('records')
+    return json.dumps(data)
+
+
+def respuesta_custom(df, page=3, sort_by=None, filter_query='{mag} >= 2.5'):
+    data, page_count = table_index.index_for(df).page(page, 15, sort_by, filter_query)
+    return json.dumps([data, page_count])
+
+
+def bench(fn, repeat=5, number=20):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(sizes):
+    casos = [
+        ('native', respuesta_nativa),
+        ('custom', respuesta_custom),
+        ('custom sort place', lambda df: respuesta_custom(
+            df, sort_by=[{'column_id': 'place', 'direction': 'asc'}])),
+        ('custom contains', lambda df: respuesta_custom(df, filter_query='{place} contains "Sitio 7"')),
+    ]
+    print(f"{'rows':>7} {'case':>18} {'bytes':>10} {'latency':>12}")
+    for n in sizes:
+        df = parse_feed(feed_bytes(n))
+        table_index.index_for(df)  # el índice se construye una vez por frame
+        for nombre, fn in casos:
+            size = len(fn(df))
+            t = bench(lambda: fn(df))
+            print(f"{n:>7} {nombre:>18} {size:>10} {t * 1e3:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,151 @@
+"""
+Varios workers de la app de sismos contra un stub de la USGS, con y sin
+el cache de feeds compartido (shared_store.py), como bajo gunicorn con
+``-w N``: cada worker es un proceso con su FeedCache y su FeedScheduler
+sobre el mismo SQLite.
+
+Todos los workers corren ``scheduler.sync`` a la vez en dos rondas: la
+primera con el store vacío (feed del mes) y la segunda ya en régimen (feed
+'hour'). Por ronda reporta los requests que recibió el stub, los feeds
+parseados sumando todos los workers y el tiempo de la ronda. Con el cache
+compartido, requests y parseos no deberían crecer con los workers
+(tests/test_workers.py lo comprueba).
+
+Uso: python benchmarks/bench_workers.py [--workers 1,2,4,8] [--eventos N] [--latencia S]
+"""
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+from stub_usgs import StubUSGS
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SISMOS = os.path.join(RAIZ, 'app_requests_terremotos')
+
+WORKERS = [1, 2, 4, 8]
+RONDAS = ('mes (store vacío)', 'hour (régimen)')
+
+# Espera máxima por ronda: un worker caído corta la corrida en vez de colgarla
+TIMEOUT = 120
+
+
+def worker(url, db, feeds, barrera, resultados):
+    sys.path.insert(0, SISMOS)
+    from event_store import EventStore
+    from feed_cache import FeedCache
+    from geojson_parser import parse_feed
+    from prefetch import FeedScheduler
+    from shared_store import SharedFeedStore
+
+    parseos = []
+
+    def parse(content):
+        parseos.append(len(content))
+        return parse_feed(content)
+
+    cache = FeedCache(parse=parse, base_url=url, shared=SharedFeedStore(feeds) if feeds else None)
+    scheduler = FeedScheduler(cache, EventStore(db))
+    for ronda in RONDAS:
+        barrera.wait(TIMEOUT)
+        scheduler.sync()
+        resultados.put((ronda, len(parseos)))
+        parseos.clear()
+
+
+def caidos(procesos):
+    return [p.exitcode for p in procesos if p.exitcode not in (None, 0)]
+
+
+def vigilar(procesos, barrera, fin):
+    """Break ``barrera`` as soon as a worker exits with an error, so no one waits for it."""
+    while not fin.wait(0.5):
+        if caidos(procesos):
+            barrera.abort()
+            return
+
+
+def resultado(resultados, procesos):
+    """Next (ronda, parseos) of a worker; raises if one died or the round timed out."""
+    limite = time.monotonic() + TIMEOUT
+    while time.monotonic() < limite:
+        try:
+            return resultados.get(timeout=0.5)
+        except queue.Empty:
+            if caidos(procesos):
+                raise RuntimeError(f"worker terminado con código {caidos(procesos)[0]}")
+    raise TimeoutError(f"la ronda no terminó en {TIMEOUT} s")
+
+
+def correr(stub, n_workers, compartido):
+    """
+    Returns
+    -------
+    list of (ronda, requests al stub, parseos, segundos) per round
+    """
+    directorio = tempfile.mkdtemp()
+    db = os.path.join(directorio, 'sismos.sqlite')
+    feeds = os.path.join(directorio, 'feeds') if compartido else ''
+
+    ctx = multiprocessing.get_context('spawn')
+    barrera, resultados = ctx.Barrier(n_workers + 1), ctx.Queue()
+    procesos = [ctx.Process(target=worker, args=(stub.url, db, feeds, barrera, resultados))
+                for _ in range(n_workers)]
+    for p in procesos:
+        p.start()
+    fin = threading.Event()
+    threading.Thread(target=vigilar, args=(procesos, barrera, fin), daemon=True).start()
+
+    filas = []
+    try:
+        for ronda in RONDAS:
+            requests = stub.requests
+            barrera.wait(TIMEOUT)
+            t = time.perf_counter()
+            parseos = sum(resultado(resultados, procesos)[1] for _ in range(n_workers))
+            filas.append((ronda, stub.requests - requests, parseos, time.perf_counter() - t))
+    except threading.BrokenBarrierError:
+        # Rota por vigilar o por el timeout: se informa el worker caído si lo hay
+        for p in procesos:
+            p.join(1)
+        if caidos(procesos):
+            raise RuntimeError(f"worker terminado con código {caidos(procesos)[0]}") from None
+        raise
+    finally:
+        fin.set()
+        for p in procesos:
+            p.join(TIMEOUT)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+
+    if caidos(procesos):
+        raise RuntimeError(f"worker terminado con código {caidos(procesos)[0]}")
+    return filas
+
+
+def opcion(argv, nombre, defecto):
+    if nombre in argv:
+        return argv[argv.index(nombre) + 1]
+    return defecto
+
+
+def main(argv):
+    workers = [int(n) for n in opcion(argv, '--workers', ','.join(map(str, WORKERS))).split(',')]
+    eventos = int(opcion(argv, '--eventos', 10000))
+    latencia = float(opcion(argv, '--latencia', 0.2))
+
+    print(f"{'cache':<12} {'workers':>7} {'ronda':<18} {'requests':>8} {'parseos':>8} {'tiempo':>10}")
+    with StubUSGS(n=eventos, latencia=latencia) as stub:
+        for compartido in (False, True):
+            for n in workers:
+                for ronda, requests, parseos, segundos in correr(stub, n, compartido):
+                    print(f"{'compartido' if compartido else 'por worker':<12} {n:>7} {ronda:<18} "
+                          f"{requests:>8} {parseos:>8} {segundos * 1e3:7.0f} ms", flush=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,125 @@
+"""
+Servidor local que imita los summary feeds de la USGS, para correr la app
+de sismos sin red: ``USGS_FEED_URL=<stub.url> python app.py``.
+
+Sirve ``/{magnitud}_{intervalo}.geojson`` a partir de un único feed
+sintético de un mes, filtrado por magnitud e intervalo, con ETag para que
+los GET condicionales del FeedCache reciban 304.
+
+Uso: python benchmarks/stub_usgs.py [n_eventos] [puerto]
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import make_feed
+
+INTERVAL_MS = {'hour': 3600e3, 'day': 86400e3, 'week': 7 * 86400e3, 'month': 30 * 86400e3}
+
+
+class StubUSGS:
+    """
+    Stub of the USGS summary feeds on 127.0.0.1, in a daemon thread.
+
+    n: int
+        Events of the month feed; the other feeds are subsets of it.
+    latencia: float
+        Seconds added to every response, to emulate the real round trip.
+    """
+
+    def __init__(self, n=1000, seed=0, latencia=0.0, port=0):
+        self.latencia = latencia
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self.set_feed(n, seed)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-usgs', daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def set_feed(self, n, seed=0):
+        """Replace the month feed with ``n`` events ending now."""
+        ahora = int(time.time() * 1000)
+        feed = make_feed(n, seed, t0=ahora - int(INTERVAL_MS['month']), span_ms=int(INTERVAL_MS['month']))
+        with self._lock:
+            self._feed = feed
+            self._ahora = ahora
+            self._cuerpos = {}
+
+    def cuerpo(self, magnitud, intervalo):
+        """Body (bytes) of the ``{magnitud}_{intervalo}`` feed."""
+        with self._lock:
+            clave = (float(magnitud), intervalo)
+            if clave not in self._cuerpos:
+                desde = self._ahora - INTERVAL_MS[intervalo]
+                features = [f for f in self._feed['features']
+                            if f['properties']['mag'] >= float(magnitud) and f['properties']['time'] >= desde]
+                self._cuerpos[clave] = json.dumps(dict(self._feed, features=features)).encode()
+            return self._cuerpos[clave]
+
+    def _responder(self, handler):
+        with self._lock:
+            self.requests += 1
+        try:
+            nombre = handler.path.rsplit('/', 1)[-1][:-len('.geojson')]
+            magnitud, intervalo = nombre.split('_')
+            cuerpo = self.cuerpo(magnitud, intervalo)
+        except (ValueError, KeyError):
+            handler.send_error(404)
+            return
+
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        etag = '"%s"' % hashlib.md5(cuerpo).hexdigest()
+        if handler.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(cuerpo)))
+        handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(cuerpo)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    stub = StubUSGS(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                    port=int(sys.argv[2]) if len(sys.argv) > 2 else 8150).start()
+    print(f"USGS_FEED_URL={stub.url}")
+    stub._thread.join()
@@ -0,0 +1,72 @@
+"""Datos sintéticos para los benchmarks de las apps."""
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def make_feed(n, seed=0, t0=1622505600000, span_ms=30 * 24 * 3600 * 1000):
+    """
+    USGS-like GeoJSON FeatureCollection with ``n`` random events.
+
+    Returns
+    -------
+    dict, ready to be dumped with ``feed_bytes``
+    """
+    rng = np.random.default_rng(seed)
+    mags = np.round(rng.uniform(1.0, 8.0, n), 2)
+    times = np.sort(t0 + rng.integers(0, span_ms, n))
+    lons = rng.uniform(-180, 180, n)
+    lats = rng.uniform(-80, 80, n)
+    depths = rng.uniform(0, 600, n)
+
+    features = []
+    for i in range(n):
+        place = f"{i % 97} km NNE of Sitio {i % 1013}"
+        features.append({
+            'type': 'Feature',
+            'id': f"sy{seed:02d}{i:08d}",
+            'properties': {
+                'mag': float(mags[i]), 'place': place, 'time': int(times[i]),
+                'updated': int(times[i]), 'tz': None, 'url': '', 'detail': '',
+                'felt': None, 'cdi': None, 'mmi': None, 'alert': None,
+                'status': 'reviewed', 'tsunami': 0, 'sig': int(mags[i] * 100),
+                'net': 'sy', 'code': f"{i:08d}", 'ids': '', 'sources': ',sy,',
+                'types': ',origin,', 'nst': None, 'dmin': None, 'rms': 0.5,
+                'gap': None, 'magType': 'ml', 'type': 'earthquake',
+                'title': f"M {mags[i]:.1f} - {place}",
+            },
+            'geometry': {'type': 'Point',
+                         'coordinates': [float(lons[i]), float(lats[i]), float(depths[i])]},
+        })
+
+    return {'type': 'FeatureCollection',
+            'metadata': {'generated': t0, 'title': 'Synthetic feed', 'count': n},
+            'features': features}
+
+
+def feed_bytes(n, seed=0, **kwargs):
+    return json.dumps(make_feed(n, seed, **kwargs)).encode()
+
+
+def escalar_tabla(df, n, clave=None, seed=0):
+    """
+    ``n`` rows resampled from ``df`` (a shipped table), with up to 5 % of
+    multiplicative noise on the numeric columns. With ``clave`` the values
+    of that column are made unique by appending the row number.
+    """
+    rng = np.random.default_rng(seed)
+    filas = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    for columna in filas.select_dtypes('number').columns:
+        filas[columna] = filas[columna] * rng.uniform(0.95, 1.05, n)
+    if clave is not None:
+        filas[clave] = [f"{codigo}-{i}" for i, codigo in enumerate(filas[clave])]
+    return filas
+
+
+def serie_caudal(n, seed=0, inicio='2020-01-05', frecuencia='15min'):
+    """Flow series like ``data_*.csv`` with ``n`` logger readings."""
+    rng = np.random.default_rng(seed)
+    caudal = 6 + np.cumsum(rng.normal(0, 0.05, n)) + np.sin(np.arange(n) / 96 * 2 * np.pi) * 0.3
+    return pd.DataFrame({'Fecha': pd.date_range(inicio, periods=n, freq=frecuencia),
+                         'C (L/min)': np.abs(caudal)})
@@ -0,0 +1,146 @@
+"""
+Compresión de las respuestas de las apps, en vez de la de Dash.
+
+Dash comprime con Flask-Compress, sólo gzip, y vuelve a comprimir cada
+respuesta aunque sea idéntica a una anterior. Aquí cada request negocia
+br o gzip según su ``Accept-Encoding``, las respuestas chicas salen sin
+comprimir y los bytes comprimidos se guardan por hash del contenido: una
+figura, un layout o un bundle de JS que reciben muchos usuarios (los mismos
+inputs y la misma versión de los datos dan los mismos bytes) se comprime
+una vez por proceso y el resto de las veces sólo se hashea. Calcular un
+hash es mucho más barato que comprimir, y como la clave es el contenido
+una respuesta nueva nunca recibe bytes de otra.
+
+Las apps la activan a través de ``configuracion.crear_app``, que crea
+dash.Dash con ``compress=False``; con ``COMPRESION=0`` vuelven a la
+compresión de Dash.
+``benchmarks/bench_compresion.py`` mide bytes y CPU por callback.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import flask
+
+from metricas import registro
+
+# Brotli es opcional: sin él se negocia sólo gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACTIVADO = os.environ.get('COMPRESION', '1') == '1'
+
+# Por debajo de esto el encabezado y el CPU no compensan lo que se ahorra
+MIN_BYTES = 500
+
+# Niveles para respuestas dinámicas: brotli 5 comprime más que gzip 6 en
+# un tiempo parecido; los niveles máximos tardan segundos en un bundle de JS
+CALIDAD_BROTLI = 5
+NIVEL_GZIP = 6
+
+TIPOS = {'application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html', 'text/plain'}
+
+# Memoria para los cuerpos comprimidos del proceso, compartida por las apps
+CACHE_BYTES = int(os.environ.get('COMPRESION_CACHE_MB', 64)) * 2 ** 20
+
+
+class CacheComprimidas:
+    """
+    Compressed bodies by (encoding, content hash), least recently used
+    dropped first once they add up to more than ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._cuerpos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            cuerpo = self._cuerpos.get(clave)
+            if cuerpo is None:
+                self.misses += 1
+                return None
+            self._cuerpos.move_to_end(clave)
+            self.hits += 1
+            return cuerpo
+
+    def put(self, clave, cuerpo):
+        if len(cuerpo) > self.max_bytes // 4:
+            return
+        with self._lock:
+            anterior = self._cuerpos.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior)
+            self._cuerpos[clave] = cuerpo
+            self.bytes += len(cuerpo)
+            while self.bytes > self.max_bytes:
+                _, descartado = self._cuerpos.popitem(last=False)
+                self.bytes -= len(descartado)
+
+    def clear(self):
+        with self._lock:
+            self._cuerpos.clear()
+            self.bytes = 0
+
+
+cache = CacheComprimidas()
+registro.cache('compresion', lambda: (cache.hits, cache.misses))
+
+
+def negociar(accept_encodings):
+    """
+    'br', 'gzip' or None for a request's ``Accept-Encoding`` (werkzeug's
+    ``request.accept_encodings``): the one with the highest quality, br on
+    a tie.
+    """
+    calidades = [('br', accept_encodings['br'] if brotli else 0), ('gzip', accept_encodings['gzip'])]
+    codificacion, calidad = max(calidades, key=lambda par: par[1])
+    return codificacion if calidad > 0 else None
+
+
+def comprimir(datos, codificacion):
+    """``datos`` compressed with ``codificacion`` ('br' or 'gzip')."""
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=CALIDAD_BROTLI)
+    return gzip.compress(datos, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+def cuerpo_comprimido(datos, codificacion, cache=cache):
+    """Compressed ``datos``, from ``cache`` if the same bytes were already compressed."""
+    clave = (codificacion, hashlib.blake2b(datos, digest_size=16).digest())
+    comprimidos = cache.get(clave)
+    if comprimidos is None:
+        comprimidos = comprimir(datos, codificacion)
+        cache.put(clave, comprimidos)
+    return comprimidos
+
+
+def _comprimir_respuesta(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in TIPOS):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    codificacion = negociar(flask.request.accept_encodings)
+    if codificacion is None:
+        return response
+    datos = response.get_data()
+    if len(datos) < MIN_BYTES:
+        return response
+
+    response.set_data(cuerpo_comprimido(datos, codificacion))
+    response.headers['Content-Encoding'] = codificacion
+    return response
+
+
+def activar(app):
+    """Compress the responses of the Dash ``app`` (created with ``compress=False``)."""
+    app.server.after_request(_comprimir_respuesta)
@@ -0,0 +1,48 @@
+"""
+Configuración del servidor común a las tres apps.
+
+Cada app.py crea su app con ``crear_app(__name__)`` en vez de
+``dash.Dash(__name__)``: mide los callbacks y expone /metrics
+(metricas.py) y comprime las respuestas con br o gzip (compresion.py,
+``COMPRESION=0`` vuelve a la compresión de Dash).
+
+Lo que vale para todo el proceso y no para una app, como las figuras
+compactas (serializacion.py, ``FIGURAS_COMPACTAS=1``), lo hace
+``configurar_proceso``, una vez, desde el punto de entrada: portal.py o el
+``__main__`` de cada app.py.
+"""
+import dash
+
+import compresion
+import serializacion
+from metricas import instrumentar
+
+
+def crear_app(nombre, **kwargs):
+    """Dash app of the module ``nombre``, set up with ``configurar``."""
+    # Dash comprime sólo si se desactiva la compresión propia (COMPRESION=0)
+    app = dash.Dash(nombre, compress=not compresion.ACTIVADO, **kwargs)
+    configurar(app)
+    return app
+
+
+def configurar(app):
+    """Instrument ``app`` and set up how its responses are compressed."""
+    # Mide cada callback y expone /metrics
+    instrumentar(app)
+
+    # Respuestas en br o gzip, comprimidas una vez por contenido distinto
+    if compresion.ACTIVADO:
+        compresion.activar(app)
+
+
+def configurar_proceso():
+    """
+    Set up what applies to every Dash app of this process: the compact
+    figure encoding with ``FIGURAS_COMPACTAS=1``, which replaces Plotly's
+    JSON encoder process-wide. Called once by the entry point, before
+    serving.
+    """
+    # Respuestas con arrays redondeados y sin defaults, en todas las apps
+    if serializacion.ACTIVADO:
+        serializacion.activar()
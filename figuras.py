@@ -0,0 +1,95 @@
+"""
+Figuras armadas una vez con Plotly Express y rellenadas en cada request.
+
+Cada llamada a ``px.*`` valida sus argumentos, arma un DataFrame y
+construye la figura validando cada propiedad: decenas de ms aun para 12
+barras. Lo que no depende de los datos (estilo, colorbar, hovertemplate,
+formato de los ejes) es igual en todas las llamadas con los mismos
+argumentos, así que px arma la figura una vez por combinación de ellos y
+se guarda su JSON, el esqueleto. En cada request ``llenar`` copia sólo los
+dicts que cambian y pone los arrays de datos y el título.
+
+El resultado es un dict con la forma de ``fig.to_plotly_json()``, que Dash
+acepta como ``figure``. Los esqueletos se comparten entre requests y no se
+deben modificar. ``tests/test_figuras.py`` comprueba que cada figura es
+igual a la de px y ``benchmarks/bench_figuras.py`` mide el costo por
+llamada.
+"""
+import threading
+
+# Plotly Express dibuja con WebGL (Scattergl) los scatter y line de más filas
+MAX_FILAS_SVG = 1000
+
+
+class Esqueletos:
+    """
+    Skeletons of one kind of figure, one per key, built on first use.
+
+    construir: callable
+        Returns the Plotly Express figure (go.Figure) the skeleton is taken
+        from; the data it is built with is replaced by ``llenar``.
+    """
+
+    def __init__(self, construir):
+        self.construir = construir
+        self._esqueletos = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave, *args, **kwargs):
+        """Skeleton for ``clave``, built as ``construir(*args, **kwargs)`` the first time."""
+        esqueleto = self._esqueletos.get(clave)
+        if esqueleto is None:
+            with self._lock:
+                esqueleto = self._esqueletos.get(clave)
+                if esqueleto is None:
+                    esqueleto = self._esqueletos[clave] = self.construir(*args, **kwargs).to_plotly_json()
+        return esqueleto
+
+    def __len__(self):
+        return len(self._esqueletos)
+
+
+def forma(filas):
+    """
+    What the structure of a px.scatter or px.line figure depends on besides
+    its arguments: 'vacia' (px draws no trace without rows), 'svg' or
+    'webgl'. Part of the key of their skeletons.
+    """
+    if filas == 0:
+        return 'vacia'
+    return 'webgl' if filas > MAX_FILAS_SVG else 'svg'
+
+
+def _con(base, cambios):
+    """Copy of ``base`` with ``cambios`` set; 'a.b' keys copy only the dicts on their path."""
+    nuevo = dict(base)
+    anidados = {}
+    for clave, valor in cambios.items():
+        cabeza, _, resto = clave.partition('.')
+        if resto:
+            anidados.setdefault(cabeza, {})[resto] = valor
+        else:
+            nuevo[cabeza] = valor
+    for cabeza, sub in anidados.items():
+        nuevo[cabeza] = _con(nuevo.get(cabeza) or {}, sub)
+    return nuevo
+
+
+def llenar(esqueleto, trazas=(), titulo=None, layout=None):
+    """
+    Figure dict from ``esqueleto`` with new data.
+
+    trazas: sequence of dict
+        Properties to set on each trace, in order, e.g. ``{'x': ...,
+        'marker.size': ...}``; traces without an entry keep the skeleton's.
+    titulo: str
+        Title text, if it changes.
+    layout: dict
+        Other layout properties to set, with the same dotted keys.
+    """
+    data = [_con(traza, trazas[i]) if i < len(trazas) else traza
+            for i, traza in enumerate(esqueleto['data'])]
+    cambios = dict(layout or {})
+    if titulo is not None:
+        cambios['title.text'] = titulo
+    return {'data': data, 'layout': _con(esqueleto['layout'], cambios)}
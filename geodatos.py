@@ -0,0 +1,290 @@
+"""
+Capa de datos compartida por las apps.
+
+Los CSV se compilan una vez a un bundle columnar en ``.bundle/``: un
+archivo .npy por columna, con tipos ya resueltos y fechas parseadas.
+Cargar una tabla es entonces abrir esos .npy con ``mmap_mode='r'``, sin
+parsear texto, y los workers que cargan la misma tabla comparten las
+páginas del archivo en vez de tener cada uno su copia.
+
+Una tabla se recompila sólo cuando cambia su CSV: primero se compara el
+mtime y, si difiere, el sha256 del archivo. Cada versión se arma en una
+carpeta temporal y se publica con un rename, así que los workers que
+compilan a la vez al arrancar nunca reescriben arrays que otro ya mapeó.
+La compilación de cada tabla se serializa con un flock, y al publicar una
+versión se borran las más viejas pero no la anterior, que un worker puede
+estar abriendo todavía.
+
+Uso: python geodatos.py [--forzar]   (compila todas las tablas)
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# flock sólo existe en POSIX; en Windows queda sólo el lock entre hilos
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_DIR = os.environ.get('GEODATOS_BUNDLE', os.path.join(RAIZ, '.bundle'))
+
+_CAUDALES = ['baroa', 'chilco', 'cipres', 'cornou', 'tumbes', 'vpinoh', 'vsur']
+
+# tabla -> (CSV relativo a la raíz del repo, columnas con fechas)
+TABLAS = {
+    'geoquimica': ('app_mapa_barras_caudales/data/geoquimica_limpio_index.csv', []),
+    'lonlat_caudales': ('app_mapa_barras_caudales/data/lonlat_caudales.csv', []),
+}
+TABLAS.update({f'data_{nombre}': (f'app_mapa_barras_caudales/data/data_{nombre}.csv', ['Fecha'])
+               for nombre in _CAUDALES})
+
+# Tablas ya leídas en este proceso, con la versión del bundle de la que
+# salieron: las apps montadas juntas (portal.py) comparten los arrays
+_cargadas = {}
+_lock = threading.Lock()
+_lock_compilar = threading.Lock()
+
+
+def fuente(tabla):
+    """Absolute path of the CSV a table is compiled from."""
+    return os.path.join(RAIZ, TABLAS[tabla][0])
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _leer_meta(tabla):
+    try:
+        with open(os.path.join(BUNDLE_DIR, f'{tabla}.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_meta(tabla, meta):
+    # Escritura atómica para que otro worker nunca lea un JSON a medias
+    fd, tmp = tempfile.mkstemp(dir=BUNDLE_DIR, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(BUNDLE_DIR, f'{tabla}.json'))
+
+
+def _vigente(tabla, meta, comparar_sha=True):
+    """True if the compiled table still matches its CSV."""
+    if meta is None or not os.path.isdir(os.path.join(BUNDLE_DIR, meta['dir'])):
+        return False
+    stat = os.stat(fuente(tabla))
+    if stat.st_mtime_ns == meta['mtime_ns'] and stat.st_size == meta['size']:
+        return True
+    if comparar_sha and _sha256(fuente(tabla)) == meta['sha256']:
+        # Sólo cambió el mtime (checkout, copia): se actualiza y se reutiliza
+        meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _escribir_meta(tabla, meta)
+        return True
+    return False
+
+
+def compilar(tabla, reemplazar=False):
+    """
+    Compile one CSV into the bundle, without checking whether it changed.
+
+    The arrays of a CSV version are written once: if another process
+    already published them they are reused, unless ``reemplazar``.
+    """
+    path, fechas = TABLAS[tabla]
+    # Se lee una sola vez: el CSV puede cambiar entre el sha256 y el parseo
+    stat = os.stat(fuente(tabla))
+    with open(fuente(tabla), 'rb') as f:
+        contenido = f.read()
+    sha = hashlib.sha256(contenido).hexdigest()
+
+    directorio = f'{tabla}-{sha[:12]}'
+    # La versión vigente hasta ahora se conserva: otro worker puede haber
+    # leído ya el meta que la indica y estar por abrir sus arrays
+    meta = _leer_meta(tabla) or {}
+    anterior = meta.get('dir') if meta.get('dir') != directorio else meta.get('anterior')
+    destino = os.path.join(BUNDLE_DIR, directorio)
+    columnas = _leer_columnas(destino)
+    if columnas is None or reemplazar:
+        # Una carpeta sin columnas.json quedó de una versión anterior de este módulo
+        columnas = _publicar(tabla, destino, pd.read_csv(io.BytesIO(contenido), parse_dates=fechas),
+                             reemplazar or os.path.isdir(destino))
+
+    _escribir_meta(tabla, {'fuente': path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                           'sha256': sha, 'dir': directorio, 'anterior': anterior, 'columnas': columnas})
+
+    # Versiones más viejas: quien aún las tenga mapeadas conserva sus páginas
+    for carpeta in os.listdir(BUNDLE_DIR):
+        if carpeta.startswith(f'{tabla}-') and carpeta not in (directorio, anterior):
+            shutil.rmtree(os.path.join(BUNDLE_DIR, carpeta), ignore_errors=True)
+
+
+def _leer_columnas(destino):
+    """Columns of a published version directory, or None if there is none."""
+    try:
+        with open(os.path.join(destino, 'columnas.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _publicar(tabla, destino, df, reemplazar=False):
+    """
+    Write the columns of ``df`` to a temporary directory and rename it to
+    ``destino``. If another process published ``destino`` meanwhile its
+    columns are used instead, unless ``reemplazar``.
+
+    Returns
+    -------
+    list with the column entries of the published directory
+    """
+    # El prefijo con punto no coincide con el de las versiones publicadas
+    temporal = tempfile.mkdtemp(dir=BUNDLE_DIR, prefix=f'.{tabla}-')
+
+    columnas = []
+    for i, (nombre, serie) in enumerate(df.items()):
+        archivo = f'{i}.npy'
+        nulos = None
+        if serie.dtype == object:
+            # Texto como unicode de ancho fijo, que sí se puede mapear
+            mascara = serie.isna().to_numpy()
+            valores = np.array(serie.where(~mascara, '').astype(str).tolist(), dtype=str)
+            if mascara.any():
+                nulos = f'{i}.nulos.npy'
+                np.save(os.path.join(temporal, nulos), mascara)
+            tipo = 'texto'
+        else:
+            valores = serie.to_numpy()
+            tipo = str(valores.dtype)
+        np.save(os.path.join(temporal, archivo), valores)
+        columnas.append({'nombre': nombre, 'tipo': tipo, 'archivo': archivo, 'nulos': nulos})
+    with open(os.path.join(temporal, 'columnas.json'), 'w') as f:
+        json.dump(columnas, f, indent=1)
+
+    # rename no reemplaza una carpeta con contenido: la anterior se aparta
+    # primero, y sus archivos siguen vivos para quien los tenga mapeados
+    apartada = None
+    if reemplazar and os.path.isdir(destino):
+        apartada = tempfile.mkdtemp(dir=BUNDLE_DIR, prefix=f'.{tabla}-')
+        try:
+            os.rename(destino, os.path.join(apartada, 'anterior'))
+        except FileNotFoundError:
+            pass
+    try:
+        os.rename(temporal, destino)
+    except OSError:
+        # Otro proceso publicó la misma versión primero: se usa la suya
+        shutil.rmtree(temporal, ignore_errors=True)
+        publicadas = _leer_columnas(destino)
+        if publicadas is None:
+            raise
+        columnas = publicadas
+    if apartada is not None:
+        shutil.rmtree(apartada, ignore_errors=True)
+    return columnas
+
+
+def construir(tablas=None, forzar=False):
+    """
+    Compile the tables whose CSV changed (all of them with ``forzar``).
+
+    Returns
+    -------
+    list with the names of the tables that were compiled
+    """
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    compiladas = []
+    for tabla in tablas or TABLAS:
+        if not forzar and _vigente(tabla, _leer_meta(tabla), comparar_sha=False):
+            continue
+        with _bloqueo(tabla):
+            # Otro proceso pudo compilarla mientras se esperaba el lock
+            if forzar or not _vigente(tabla, _leer_meta(tabla)):
+                compilar(tabla, reemplazar=forzar)
+                compiladas.append(tabla)
+    return compiladas
+
+
+@contextmanager
+def _bloqueo(tabla):
+    """Exclusive lock on compiling ``tabla`` among the processes sharing the bundle."""
+    with _lock_compilar:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(BUNDLE_DIR, f'.{tabla}.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def cargar(tabla):
+    """
+    DataFrame of ``tabla`` backed by the memory-mapped bundle, compiling it
+    first if its CSV changed. Numeric and date columns are read-only views
+    of the mapped files; text columns are materialized as Python objects.
+
+    The table is read once per process and version; each call returns a
+    shallow copy, so callers may add or replace columns but must not
+    modify values in place.
+    """
+    construir([tabla])
+    try:
+        return _cargar(tabla)
+    except FileNotFoundError:
+        # La versión del meta leído se borró antes de abrir sus arrays (otros
+        # procesos publicaron dos más, o la reemplazaron): se relee el meta
+        return _cargar(tabla)
+
+
+def _cargar(tabla):
+    meta = _leer_meta(tabla)
+    with _lock:
+        cargada = _cargadas.get(tabla)
+        if cargada is None or cargada[0] != meta['dir']:
+            cargada = _cargadas[tabla] = (meta['dir'], _leer(meta))
+    return cargada[1].copy(deep=False)
+
+
+def version(tabla):
+    """sha256 of the CSV ``tabla`` is currently compiled from."""
+    construir([tabla])
+    return _leer_meta(tabla)['sha256']
+
+
+def _leer(meta):
+    directorio = os.path.join(BUNDLE_DIR, meta['dir'])
+
+    datos = {}
+    for columna in meta['columnas']:
+        valores = np.load(os.path.join(directorio, columna['archivo']), mmap_mode='r')
+        if columna['tipo'] == 'texto':
+            valores = valores.astype(object)
+            if columna['nulos']:
+                valores[np.load(os.path.join(directorio, columna['nulos']))] = np.nan
+        datos[columna['nombre']] = valores
+
+    return pd.DataFrame(datos, copy=False)
+
+
+if __name__ == '__main__':
+    compiladas = construir(forzar='--forzar' in sys.argv[1:])
+    print(f"{len(compiladas)} tablas compiladas en {BUNDLE_DIR}: {', '.join(compiladas) or '-'}")
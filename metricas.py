@@ -0,0 +1,212 @@
+"""
+Instrumentación de los callbacks de las apps, expuesta en formato de texto
+de Prometheus en la ruta ``/metrics`` del servidor Flask.
+
+``instrumentar(app)`` se llama justo después de crear la app Dash (lo hace
+``configuracion.crear_app``): cada ``@app.callback`` declarado después
+queda medido, con el tiempo total separado en fases (``datos`` y
+``figura``, marcadas en el cuerpo del callback con ``fase``, más
+``serializacion``, que es lo que tarda Dash en codificar la respuesta), el
+tamaño de la respuesta y el input que disparó el callback. Los contadores
+de los caches y las descargas de la USGS se agregan con ``registro.cache``
+y ``registro.histograma``.
+
+Las métricas son por proceso: con varios workers de gunicorn cada uno
+expone las suyas y Prometheus las agrega.
+"""
+import bisect
+import threading
+import time
+from functools import wraps
+
+import flask
+
+# Buckets por defecto, en segundos y en bytes
+BUCKETS_SEGUNDOS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7)
+
+
+def _etiquetas(pares):
+    return ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pares)
+
+
+class Histograma:
+    """Prometheus histogram with one series per combination of labels."""
+
+    def __init__(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, valor)
+            if i < len(self.buckets):
+                serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def texto(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        with self._lock:
+            series = [(clave, list(conteos), suma, total) for clave, (conteos, suma, total) in self._series.items()]
+        for clave, conteos, suma, total in sorted(series):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{_etiquetas(clave + (("le", f"{limite:g}"),))}}} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{{{_etiquetas(clave + (("le", "+Inf"),))}}} {total}')
+            etiquetas = _etiquetas(clave)
+            lineas.append(f'{self.nombre}_sum{{{etiquetas}}} {suma:.6g}')
+            lineas.append(f'{self.nombre}_count{{{etiquetas}}} {total}')
+        return '\n'.join(lineas)
+
+
+class Registro:
+    """Metrics of one process: histograms plus cache counters read on scrape."""
+
+    def __init__(self):
+        self._histogramas = {}
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        """Histogram ``nombre``, created on first use."""
+        with self._lock:
+            if nombre not in self._histogramas:
+                self._histogramas[nombre] = Histograma(nombre, ayuda, buckets)
+            return self._histogramas[nombre]
+
+    def cache(self, nombre, contadores):
+        """
+        Export the hits and misses of a cache.
+
+        contadores: callable
+            Returns a (hits, misses) tuple; it is called on every scrape.
+        """
+        with self._lock:
+            self._caches[nombre] = contadores
+
+    def texto(self):
+        with self._lock:
+            histogramas = list(self._histogramas.values())
+            caches = sorted(self._caches.items())
+
+        bloques = [h.texto() for h in histogramas]
+        if caches:
+            conteos = [(nombre, contadores()) for nombre, contadores in caches]
+            for i, sufijo in enumerate(('hits', 'misses')):
+                nombre = f'geoapps_cache_{sufijo}_total'
+                lineas = [f'# HELP {nombre} Cache {sufijo}.', f'# TYPE {nombre} counter']
+                lineas += [f'{nombre}{{cache="{cache}"}} {valores[i]}' for cache, valores in conteos]
+                bloques.append('\n'.join(lineas))
+        return '\n'.join(bloques) + '\n'
+
+
+# Registro compartido por todo el proceso
+registro = Registro()
+
+_local = threading.local()
+
+
+class fase:
+    """
+    Context manager timing a phase (``datos``, ``figura``) of the running
+    callback. A class and not a generator, since it also runs on the
+    cached paths that take a few microseconds.
+    """
+
+    __slots__ = ('nombre', 'inicio')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        fases = getattr(_local, 'fases', None)
+        if fases is not None:
+            fases[self.nombre] = fases.get(self.nombre, 0.0) + time.perf_counter() - self.inicio
+
+
+def _disparador(entradas):
+    """
+    Input that triggered the callback in the current Dash request, if it is
+    one of ``entradas``; otherwise ``'otro'``.
+    """
+    if not flask.has_request_context():
+        return ''
+    disparados = getattr(flask.g, 'triggered_inputs', None) or [{}]
+    entrada = disparados[0].get('prop_id', '')
+    # El prop_id lo manda el navegador: sólo los declarados abren una serie
+    return entrada if not entrada or entrada in entradas else 'otro'
+
+
+def _medir(nombre, cuerpo, registro, entradas):
+    tiempos = registro.histograma('geoapps_callback_seconds',
+                                  'Callback wall time by phase.')
+    tamaños = registro.histograma('geoapps_callback_response_bytes',
+                                  'Size of the serialized callback response.', BUCKETS_BYTES)
+
+    def medido(*args, **kwargs):
+        # Envuelve al add_context de Dash: incluye la serialización
+        _local.fases = fases = {}
+        inicio = time.perf_counter()
+        try:
+            respuesta = cuerpo(*args, **kwargs)
+        finally:
+            _local.fases = None
+        total = time.perf_counter() - inicio
+
+        entrada = _disparador(entradas)
+        propio = fases.pop('_cuerpo', total)
+        fases['serializacion'] = max(total - propio, 0.0)
+        fases['total'] = total
+        for nombre_fase, segundos in fases.items():
+            tiempos.observar(segundos, callback=nombre, fase=nombre_fase, entrada=entrada)
+        tamaños.observar(len(respuesta), callback=nombre)
+        return respuesta
+
+    return medido
+
+
+def instrumentar(app, registro=registro, ruta='/metrics'):
+    """
+    Measure every callback declared on ``app`` from now on and serve the
+    metrics of ``registro`` at ``ruta`` on ``app.server``.
+    """
+    declarar = app.callback
+
+    def callback(*args, **kwargs):
+        envolver = declarar(*args, **kwargs)
+
+        def decorador(func):
+            @wraps(func)
+            def cuerpo(*a, **k):
+                with fase('_cuerpo'):
+                    return func(*a, **k)
+
+            add_context = envolver(cuerpo)
+            add_context.__wrapped__ = func
+            for entrada in app.callback_map.values():
+                if entrada.get('callback') is add_context:
+                    entradas = frozenset(f"{i['id']}.{i['property']}" for i in entrada['inputs'])
+                    entrada['callback'] = _medir(func.__name__, add_context, registro, entradas)
+            return add_context
+
+        return decorador
+
+    app.callback = callback
+
+    @app.server.route(ruta)
+    def metrics():
+        return flask.Response(registro.texto(), mimetype='text/plain; version=0.0.4')
+
+    return app
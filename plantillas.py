@@ -0,0 +1,26 @@
+"""
+Plantillas de Plotly usadas por las apps.
+
+Plotly arma cada plantilla la primera vez que se usa, y esa construcción
+no es segura entre hilos: dos hilos armando figuras a la vez sobre una
+plantilla todavía fría pueden fallar con ``ValueError: Invalid value``.
+Las apps que arman figuras en hilos de fondo (precalentado) llaman a
+``precargar`` al importarse, antes de lanzar esos hilos.
+"""
+import plotly.io as pio
+
+
+def precargar(*nombres):
+    """
+    Build the templates ``nombres`` (the default one if none is given) in
+    the calling thread, including the per-trace defaults Plotly Express
+    reads from them.
+    """
+    for nombre in nombres or (pio.templates.default,):
+        plantilla = pio.templates[nombre]
+        for tipo in plantilla.data:
+            for traza in plantilla.data[tipo]:
+                for hijo in ('marker', 'line'):
+                    if hijo in traza:
+                        traza[hijo].to_plotly_json()
+        plantilla.layout.to_plotly_json()
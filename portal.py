@@ -0,0 +1,122 @@
+"""
+Las tres apps en un solo proceso, cada una como página en su ruta:
+``python portal.py`` o ``gunicorn portal:server``.
+
+Cada app se importa recién con el primer request a su ruta, así que una
+página que nadie visita no carga sus datos ni lanza sus hilos (el
+scheduler de sismos, los precalentados). Las que sí se visitan comparten
+el proceso: pandas, Plotly y Dash se cargan una vez, las tablas del bundle
+se leen una vez (``geodatos.cargar``) y ``/metrics`` reúne las métricas de
+todas.
+
+Las apps siguen siendo apps Dash separadas, montadas en su prefijo, y no
+callbacks de una sola app: comparten ids de componentes (``mapa``) y cada
+una tiene sus assets. Los links entre páginas recargan la página.
+"""
+import importlib.util
+import os
+import sys
+import threading
+
+import flask
+from werkzeug.serving import run_simple
+from werkzeug.utils import redirect
+
+from configuracion import configurar_proceso
+from metricas import registro
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+# ruta -> (carpeta de la app, título)
+PAGINAS = {
+    'caudales': ('app_mapa_barras_caudales', 'Geoquímica y caudales'),
+    'scatter': ('app_scatter_elementos', 'Correlación de elementos'),
+    'sismos': ('app_requests_terremotos', 'Sismos recientes'),
+}
+
+INDICE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>dash-plotly-geoapps</title></head>
+<body style="font-family: 'Lucida Sans'; margin: 2em">
+<h1>dash-plotly-geoapps</h1>
+<ul>
+{% for ruta, (carpeta, titulo) in paginas.items() %}
+<li><a href="{{ ruta }}/">{{ titulo }}</a></li>
+{% endfor %}
+</ul>
+</body>
+</html>
+"""
+
+
+class Portal:
+    """
+    WSGI app that serves each app of ``paginas`` under ``/<ruta>/`` and
+    everything else with ``raiz``. An app is imported on the first request
+    to its route.
+    """
+
+    def __init__(self, raiz, paginas):
+        self.raiz = raiz
+        self.paginas = paginas
+        self._servidores = {}
+        self._lock = threading.Lock()
+
+    def cargar(self, ruta):
+        """Flask server of the app at ``ruta``, importing it on first use."""
+        servidor = self._servidores.get(ruta)
+        if servidor is not None:
+            return servidor
+
+        with self._lock:
+            if ruta not in self._servidores:
+                carpeta = os.path.join(RAIZ, self.paginas[ruta][0])
+                if carpeta not in sys.path:
+                    sys.path.insert(0, carpeta)
+
+                # Dash lee el prefijo de sus URLs de esta variable al crearse
+                os.environ['DASH_REQUESTS_PATHNAME_PREFIX'] = f'/{ruta}/'
+                try:
+                    nombre = f'{self.paginas[ruta][0]}.app'
+                    spec = importlib.util.spec_from_file_location(nombre, os.path.join(carpeta, 'app.py'))
+                    modulo = importlib.util.module_from_spec(spec)
+                    sys.modules[nombre] = modulo
+                    spec.loader.exec_module(modulo)
+                finally:
+                    del os.environ['DASH_REQUESTS_PATHNAME_PREFIX']
+                self._servidores[ruta] = modulo.app.server
+            return self._servidores[ruta]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        ruta, _, resto = path.lstrip('/').partition('/')
+        if ruta not in self.paginas:
+            return self.raiz(environ, start_response)
+        if not resto and not path.endswith('/'):
+            return redirect(f"{environ.get('SCRIPT_NAME', '')}/{ruta}/")(environ, start_response)
+
+        servidor = self.cargar(ruta)
+        environ = dict(environ, SCRIPT_NAME=f"{environ.get('SCRIPT_NAME', '')}/{ruta}", PATH_INFO=f'/{resto}')
+        return servidor(environ, start_response)
+
+
+raiz = flask.Flask(__name__)
+
+
+@raiz.route('/')
+def indice():
+    return flask.render_template_string(INDICE, paginas=PAGINAS)
+
+
+@raiz.route('/metrics')
+def metrics():
+    return flask.Response(registro.texto(), mimetype='text/plain; version=0.0.4')
+
+
+# Una vez para las tres apps, que comparten el codificador de Plotly
+configurar_proceso()
+server = Portal(raiz, PAGINAS)
+
+
+if __name__ == '__main__':
+    run_simple('127.0.0.1', int(os.environ.get('PORT', 8050)), server, threaded=True)
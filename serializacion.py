@@ -0,0 +1,159 @@
+"""
+Serialización compacta de las figuras de las apps (opcional).
+
+Las respuestas de los callbacks son figuras de Plotly con arrays numéricos
+de 15-17 cifras significativas, como ``-73.1136944439842``, que ningún
+mapa o gráfico puede mostrar. Con ``activar()`` las respuestas y el layout
+de la app se codifican así:
+
+- los arrays float de las trazas se redondean: lat/lon a
+  ``DECIMALES_COORDENADAS`` decimales (5 decimales son ~1 m) y el resto a
+  ``CIFRAS`` cifras significativas; los que quedan enteros se envían como
+  enteros;
+- se quitan de cada traza las propiedades que Plotly Express escribe con
+  el mismo valor que plotly.js usa por defecto (``DEFAULTS_TRAZA``);
+- se codifica con orjson si está instalado, en una sola pasada, en vez del
+  ``PlotlyJSONEncoder``, que codifica dos veces cuando hay NaN.
+
+Los arrays siguen siendo listas JSON: el plotly.js de Dash 1.20 no lee
+arrays binarios (base64), que recién aparecen en plotly.js 2.28.
+
+Se activa para todo el proceso con la variable de entorno
+``FIGURAS_COMPACTAS=1`` (``configuracion.configurar_proceso``): el
+codificador de Plotly es uno solo, así que no se puede activar para una
+app y no para las otras montadas en el mismo proceso (portal.py).
+``FIGURAS_CIFRAS`` y ``FIGURAS_DECIMALES_COORDENADAS`` ajustan la precisión.
+"""
+import math
+import os
+
+import numpy as np
+import plotly.utils
+from plotly.utils import PlotlyJSONEncoder
+
+# Codificador JSON rápido si está instalado
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ACTIVADO = os.environ.get('FIGURAS_COMPACTAS', '0') == '1'
+CIFRAS = int(os.environ.get('FIGURAS_CIFRAS', 6))
+DECIMALES_COORDENADAS = int(os.environ.get('FIGURAS_DECIMALES_COORDENADAS', 5))
+
+# Propiedades de traza cuyo valor es el default de plotly.js; por tipo de
+# traza, con None para las que aplican a todos los tipos
+DEFAULTS_TRAZA = {
+    None: {'visible': True, 'legendgroup': '', 'xaxis': 'x', 'yaxis': 'y'},
+    'scattermapbox': {'subplot': 'mapbox'},
+    'bar': {'orientation': 'v', 'offsetgroup': '', 'textposition': 'auto'},
+    'scatter': {'orientation': 'v'},
+}
+
+# Arrays de coordenadas geográficas
+COORDENADAS = {'lat', 'lon'}
+
+
+def redondear(valores, cifras=CIFRAS, decimales=None):
+    """
+    Round a float array to ``decimales`` decimals or, if None, to
+    ``cifras`` significant digits. NaN and infinities are kept.
+    """
+    valores = np.asarray(valores, dtype='float64')
+    if decimales is not None:
+        return np.round(valores, decimales)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitud = np.floor(np.log10(np.abs(valores)))
+        escala = 10.0 ** (cifras - 1 - np.where(np.isfinite(magnitud), magnitud, 0))
+        return np.where(np.isfinite(valores), np.round(valores * escala) / escala, valores)
+
+
+def _array_compacto(valores, decimales):
+    """Rounded float array as a list; integral arrays as ints, NaN as None."""
+    valores = redondear(valores, decimales=decimales)
+    finitos = np.isfinite(valores)
+    if finitos.all():
+        if np.array_equal(valores, np.trunc(valores)) and np.abs(valores).max(initial=0) < 2 ** 53:
+            return valores.astype('int64').tolist()
+        return valores.tolist()
+    lista = valores.astype(object)
+    lista[~finitos] = None
+    return lista.tolist()
+
+
+def _es_float(valores):
+    if isinstance(valores, np.ndarray):
+        return valores.dtype.kind == 'f'
+    return (isinstance(valores, (list, tuple)) and len(valores) > 0
+            and all(isinstance(v, float) for v in valores))
+
+
+def _compactar_valor(clave, valor):
+    if _es_float(valor):
+        return _array_compacto(valor, DECIMALES_COORDENADAS if clave in COORDENADAS else None)
+    if isinstance(valor, dict):
+        return {k: _compactar_valor(k, v) for k, v in valor.items()}
+    return valor
+
+
+def compactar_traza(traza):
+    """Trace dict without default-valued properties and with rounded arrays."""
+    defaults = dict(DEFAULTS_TRAZA[None], **DEFAULTS_TRAZA.get(traza.get('type', 'scatter'), {}))
+    return {clave: _compactar_valor(clave, valor) for clave, valor in traza.items()
+            if not (clave in defaults and isinstance(valor, (str, bool)) and valor == defaults[clave])}
+
+
+def compactar(objeto):
+    """
+    Copy of ``objeto`` (a response, a layout, any JSON-able structure) with
+    every Plotly figure in it compacted. Figures may be graph objects or
+    dicts with 'data' and 'layout'.
+    """
+    if hasattr(objeto, 'to_plotly_json') and hasattr(objeto, 'data') and hasattr(objeto, 'layout'):
+        objeto = objeto.to_plotly_json()
+    if isinstance(objeto, dict):
+        if isinstance(objeto.get('data'), (list, tuple)) and 'layout' in objeto:
+            return dict(objeto, data=[compactar_traza(traza) for traza in objeto['data']])
+        return {k: compactar(v) for k, v in objeto.items()}
+    if isinstance(objeto, (list, tuple)):
+        return [compactar(v) for v in objeto]
+    if hasattr(objeto, 'to_plotly_json'):
+        return compactar(objeto.to_plotly_json())
+    return objeto
+
+
+_respaldo = PlotlyJSONEncoder()
+
+
+def _default(objeto):
+    # Lo que orjson no conoce (componentes Dash, Timestamps, arrays object)
+    if isinstance(objeto, np.ndarray):
+        return objeto.tolist()
+    if isinstance(objeto, float) and not math.isfinite(objeto):
+        return None
+    return _respaldo.default(objeto)
+
+
+def dumps(objeto):
+    """Compact JSON string of ``objeto``."""
+    objeto = compactar(objeto)
+    if orjson is not None:
+        return orjson.dumps(objeto, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return PlotlyJSONEncoder(separators=(',', ':')).encode(objeto)
+
+
+class EncoderCompacto(PlotlyJSONEncoder):
+    """PlotlyJSONEncoder that encodes through ``dumps``."""
+
+    def encode(self, o):
+        return dumps(o)
+
+
+def activar():
+    """
+    Encode every Dash response (callbacks and layout) of this process with
+    ``dumps``. Dash 1.20 has no hook for its encoder: it looks up
+    ``plotly.utils.PlotlyJSONEncoder`` on each response, so that is what is
+    replaced.
+    """
+    plotly.utils.PlotlyJSONEncoder = EncoderCompacto
@@ -0,0 +1,8 @@
+import os
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Los módulos de la app de sismos se importan desde su carpeta, como en app.py
+sys.path.insert(0, os.path.join(RAIZ, 'app_requests_terremotos'))
+sys.path.insert(0, RAIZ)
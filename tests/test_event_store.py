@@ -0,0 +1,97 @@
+"""
+Snapshots de feeds grabados de la USGS (fixtures/feeds/) aplicados en
+orden a EventStore.merge, con la ventana que usa FeedScheduler.sync.
+"""
+import json
+import os
+
+import pytest
+
+from event_store import EventStore
+from geojson_parser import parse_feed
+from prefetch import DELETE_MARGIN, INTERVAL_SECONDS
+
+FEEDS = os.path.join(os.path.dirname(__file__), 'fixtures', 'feeds')
+
+# Sismo de dos días antes del primer snapshot: sólo está en el feed del mes
+ANTIGUO = 'ak0238s1vq2k'
+
+
+def merge_snapshot(store, nombre, synced_at=None):
+    """
+    Merge ``fixtures/feeds/<nombre>.geojson`` as FeedScheduler.sync would,
+    synced when the feed was generated unless ``synced_at`` is given.
+    """
+    with open(os.path.join(FEEDS, f'{nombre}.geojson'), 'rb') as f:
+        content = f.read()
+    generated = json.loads(content)['metadata']['generated'] / 1000
+    intervalo = nombre.split('_')[1]
+    return store.merge(parse_feed(content),
+                       start=generated - INTERVAL_SECONDS[intervalo] + DELETE_MARGIN,
+                       end=generated, min_mag=1.0, synced_at=synced_at or generated, snapshot=nombre)
+
+
+def eventos(store):
+    df = store.query()
+    return dict(zip(df['id'], df['mag']))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / 'sismos.sqlite'))
+    merge_snapshot(store, '1.0_month_1700000000')
+    yield store
+    store.close()
+
+
+def test_month_snapshot_fills_empty_store(store):
+    assert eventos(store) == {'nc73950641': 1.8, 'us7000l5ab': 4.6, ANTIGUO: 1.4}
+    assert store.last_sync() == 1700000000
+
+
+def test_new_event_is_inserted(store):
+    counts = merge_snapshot(store, '1.0_hour_1700000060')
+    assert counts == {'inserted': 1, 'updated': 0, 'deleted': 0}
+    assert eventos(store)['hv73612847'] == 2.3
+
+
+def test_magnitude_revision_updates_event(store):
+    merge_snapshot(store, '1.0_hour_1700000060')
+    counts = merge_snapshot(store, '1.0_hour_1700000120')
+    assert counts == {'inserted': 0, 'updated': 1, 'deleted': 0}
+    assert eventos(store)['nc73950641'] == 2.1
+    assert len(store) == 4
+
+
+def test_event_missing_inside_window_is_deleted(store):
+    for nombre in ('1.0_hour_1700000060', '1.0_hour_1700000120'):
+        merge_snapshot(store, nombre)
+    counts = merge_snapshot(store, '1.0_hour_1700000180')
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 1}
+    assert 'us7000l5ab' not in eventos(store)
+
+
+def test_event_outside_window_is_kept(store):
+    # Ningún feed 'hour' trae el sismo antiguo, pero su ventana no lo cubre
+    for nombre in ('1.0_hour_1700000060', '1.0_hour_1700000120', '1.0_hour_1700000180'):
+        merge_snapshot(store, nombre)
+    assert eventos(store) == {'nc73950641': 2.1, 'hv73612847': 2.3, ANTIGUO: 1.4}
+
+
+def test_snapshot_already_merged_is_skipped(store, tmp_path):
+    merge_snapshot(store, '1.0_hour_1700000060')
+    antes = eventos(store)
+    # Un snapshot saltado no registra un sync nuevo
+    assert merge_snapshot(store, '1.0_hour_1700000060', synced_at=1700000090) == {
+        'inserted': 0, 'updated': 0, 'deleted': 0}
+    assert store.last_sync() == 1700000060
+
+    # Otro worker con el mismo archivo tampoco lo vuelve a aplicar
+    otro = EventStore(str(tmp_path / 'sismos.sqlite'))
+    try:
+        assert merge_snapshot(otro, '1.0_hour_1700000060', synced_at=1700000090) == {
+            'inserted': 0, 'updated': 0, 'deleted': 0}
+        assert otro.last_sync() == 1700000060
+        assert eventos(otro) == antes
+    finally:
+        otro.close()
@@ -0,0 +1,69 @@
+"""
+Figuras rellenadas desde un esqueleto (figuras.py) contra las de Plotly
+Express que reemplazan, en los casos de benchmarks/bench_figuras.py: deben
+serializar al mismo JSON, como las envía Dash.
+"""
+import json
+import os
+import sys
+
+import pytest
+from plotly.utils import PlotlyJSONEncoder
+
+from conftest import RAIZ
+
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+from bench_figuras import casos  # noqa: E402
+
+# Más de 1000 filas: el scatter pasa a Scattergl y el mapa agrega en bins
+N = 2000
+
+
+def decodificado(figura):
+    return json.loads(json.dumps(figura, cls=PlotlyJSONEncoder))
+
+
+def diferencia(a, b, ruta=''):
+    """Path of the first difference between two decoded figures, or None."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        for clave in sorted(set(a) | set(b)):
+            if clave not in a or clave not in b:
+                return f'{ruta}.{clave}'
+            d = diferencia(a[clave], b[clave], f'{ruta}.{clave}')
+            if d:
+                return d
+        return None
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        for i, (x, y) in enumerate(zip(a, b)):
+            d = diferencia(x, y, f'{ruta}[{i}]')
+            if d:
+                return d
+        return None
+    return None if a == b else ruta or '.'
+
+
+@pytest.fixture(scope='module')
+def diferencias():
+    """(nombre, first difference or None) of every case of bench_figuras."""
+    resultado = []
+    # Los casos cambian datos de las apps al avanzar: se recorren una vez
+    for nombre, con_px, con_esqueleto, *args in casos([N]):
+        args = args[0] if args else ()
+        resultado.append((nombre, diferencia(decodificado(con_px(*args)), decodificado(con_esqueleto(*args)))))
+    return resultado
+
+
+@pytest.mark.parametrize('figura, requeridos', [
+    ('plot_map', ['plot_map vacío', f'plot_map {N} (bins)', f'plot_map {N} zoom']),
+    ('figura_barras', []),
+    ('figura_caudales', [f'figura_caudales {N}']),
+    ('figura_scatter', ['figura_scatter 0 muestras', 'figura_scatter 1 muestras',
+                        f'figura_scatter {N} Cl/Na Log/Log Activado', f'figura_scatter {N} HCO3/Ca Linear/Log Activado',
+                        f'figura_scatter {N} err/Na Linear/Linear No activada']),
+])
+def test_skeleton_figures_match_plotly_express(diferencias, figura, requeridos):
+    propios = [(nombre, d) for nombre, d in diferencias if nombre.split(' ')[0] == figura]
+    assert propios
+    assert set(requeridos) <= {nombre for nombre, _ in propios}
+    assert [(nombre, d) for nombre, d in propios if d is not None] == []
@@ -0,0 +1,79 @@
+"""Compilación del bundle columnar (geodatos.py) por varios procesos a la vez."""
+import os
+import subprocess
+import sys
+import textwrap
+
+from conftest import RAIZ
+
+# Cada proceso compila la tabla, la mapea y vuelve a compilarla mientras la lee
+COMPILAR = textwrap.dedent('''
+    import geodatos
+    df = geodatos.cargar('geoquimica')
+    antes = df.select_dtypes('number').sum().sum()
+    for _ in range(3):
+        geodatos.compilar('geoquimica')
+    assert df.select_dtypes('number').sum().sum() == antes
+    print(antes)
+''')
+
+
+def test_concurrent_compiles_publish_one_version(tmp_path):
+    env = dict(os.environ, GEODATOS_BUNDLE=str(tmp_path), PYTHONPATH=RAIZ)
+    procesos = [subprocess.Popen([sys.executable, '-c', COMPILAR], env=env, cwd=RAIZ,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                for _ in range(6)]
+    salidas = [p.communicate(timeout=120) for p in procesos]
+
+    assert [p.returncode for p in procesos] == [0] * len(procesos), [err for _, err in salidas]
+    assert len({out for out, _ in salidas}) == 1
+    # Una sola versión publicada y ninguna carpeta temporal
+    carpetas = [nombre for nombre in os.listdir(tmp_path) if os.path.isdir(tmp_path / nombre)]
+    assert len(carpetas) == 1 and carpetas[0].startswith('geoquimica-')
+
+
+# Una tabla cuyas celdas valen todas el número de versión del CSV
+DEFINIR = textwrap.dedent('''
+    import os, sys, geodatos
+    csv, listo = sys.argv[1:]
+    geodatos.TABLAS['prueba'] = (csv, [])
+''')
+
+# Reescribe y compila el CSV una y otra vez mientras otros procesos lo cargan
+COMPILAR_CAMBIOS = DEFINIR + textwrap.dedent('''
+    try:
+        for version in range(1, 60):
+            with open(csv + '.tmp', 'w') as f:
+                f.write(','.join(f'c{i}' for i in range(200)) + '\\n')
+                f.write((','.join([str(version)] * 200) + '\\n') * (version % 7 + 1))
+            os.replace(csv + '.tmp', csv)
+            geodatos.construir(['prueba'])
+    finally:
+        open(listo, 'w').close()
+''')
+
+# Vuelve a abrir la versión vigente hasta que el otro proceso termina
+CARGAR = DEFINIR + textwrap.dedent('''
+    lecturas = 0
+    while not os.path.exists(listo) or not lecturas:
+        geodatos._cargadas.clear()
+        valores = geodatos.cargar('prueba').to_numpy()
+        assert (valores == valores[0, 0]).all(), 'filas de versiones distintas'
+        lecturas += 1
+    print(lecturas)
+''')
+
+
+def test_load_while_another_process_compiles_a_new_version(tmp_path):
+    csv, listo = tmp_path / 'prueba.csv', tmp_path / 'listo'
+    csv.write_text('c0\n0\n')
+    env = dict(os.environ, GEODATOS_BUNDLE=str(tmp_path / 'bundle'), PYTHONPATH=RAIZ)
+    procesos = [subprocess.Popen([sys.executable, '-c', codigo, str(csv), str(listo)], env=env, cwd=RAIZ,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                for codigo in (CARGAR, CARGAR, COMPILAR_CAMBIOS)]
+    salidas = [p.communicate(timeout=120) for p in procesos]
+
+    assert [p.returncode for p in procesos] == [0] * len(procesos), [err for _, err in salidas]
+    # Quedan la versión vigente y la anterior
+    carpetas = [nombre for nombre in os.listdir(tmp_path / 'bundle') if os.path.isdir(tmp_path / 'bundle' / nombre)]
+    assert len(carpetas) == 2
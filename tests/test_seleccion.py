@@ -0,0 +1,67 @@
+"""Selecciones por sesión de la app scatter (seleccion.py)."""
+import os
+import sys
+
+import pytest
+
+from conftest import RAIZ
+
+sys.path.insert(0, os.path.join(RAIZ, 'app_scatter_elementos'))
+
+from seleccion import Selecciones  # noqa: E402
+
+CODIGOS = [f'PT{i:02d}' for i in range(1, 13)]
+
+
+@pytest.fixture(params=['proceso', 'compartidas'])
+def directorio(request, tmp_path):
+    return str(tmp_path) if request.param == 'compartidas' else None
+
+
+def activas(mascara):
+    return [codigo for codigo, activa in zip(CODIGOS, mascara) if activa]
+
+
+def test_first_message_needs_whole_selection(directorio):
+    selecciones = Selecciones(CODIGOS, directorio)
+    # Sin la lista no hay selección por defecto: se pide entera
+    assert selecciones.aplicar('s', {'n': 0}) is None
+    # La selección inicial ya filtrada por error, no todas las muestras
+    assert activas(selecciones.aplicar('s', {'n': 0, 'todas': CODIGOS[:8]})) == CODIGOS[:8]
+
+
+def test_diffs_apply_in_order(directorio):
+    selecciones = Selecciones(CODIGOS, directorio)
+    selecciones.aplicar('s', {'n': 0, 'todas': CODIGOS[:8]})
+    assert activas(selecciones.aplicar('s', {'n': 1, 'agregar': ['PT10'], 'quitar': ['PT01']})) == \
+        CODIGOS[1:8] + ['PT10']
+    # Otro input dispara el callback con el mismo mensaje
+    assert activas(selecciones.aplicar('s', {'n': 1})) == CODIGOS[1:8] + ['PT10']
+    # Falta el mensaje 2
+    assert selecciones.aplicar('s', {'n': 3, 'quitar': ['PT02']}) is None
+
+
+def test_workers_share_sessions(tmp_path):
+    worker_a = Selecciones(CODIGOS, str(tmp_path))
+    worker_b = Selecciones(CODIGOS, str(tmp_path))
+    worker_a.aplicar('s', {'n': 0, 'todas': CODIGOS})
+    assert activas(worker_b.aplicar('s', {'n': 1, 'quitar': ['PT03']})) == CODIGOS[:2] + CODIGOS[3:]
+    assert activas(worker_a.aplicar('s', {'n': 2, 'quitar': ['PT04']})) == CODIGOS[:2] + CODIGOS[4:]
+
+
+def test_changed_table_forgets_sessions(tmp_path):
+    Selecciones(CODIGOS, str(tmp_path)).aplicar('s', {'n': 0, 'todas': CODIGOS})
+    assert Selecciones(CODIGOS + ['PT13'], str(tmp_path)).aplicar('s', {'n': 1, 'quitar': ['PT01']}) is None
+
+
+def test_least_recent_sessions_are_dropped(directorio):
+    selecciones = Selecciones(CODIGOS, directorio, max_sesiones=2)
+    for sesion in ('a', 'b', 'c'):
+        selecciones.aplicar(sesion, {'n': 0, 'todas': CODIGOS})
+        if directorio:
+            # El orden de las sesiones compartidas sale del mtime de sus archivos
+            os.utime(selecciones._ruta(sesion), ns=(0, {'a': 1, 'b': 2, 'c': 3}[sesion] * 10**9))
+    if directorio:
+        selecciones._descartar_antiguas()
+    assert selecciones.aplicar('a', {'n': 1}) is None
+    assert selecciones.aplicar('c', {'n': 1}) is not None
@@ -0,0 +1,43 @@
+"""Filtros de la tabla de sismos (TableIndex.filter), como los escribe dash_table."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_index import TableIndex, split_filter_part
+
+LUGARES = ['5 km NE of The Geysers, CA', '129 km SSW of Tual, Indonesia', '8 km S of Volcano, Hawaii',
+           '15 km E of Anza, CA']
+MAGNITUDES = [1.8, 4.6, 2.3, 1.1]
+
+
+@pytest.fixture
+def index():
+    return TableIndex(pd.DataFrame({'place': np.array(LUGARES, dtype=object), 'mag': MAGNITUDES}))
+
+
+def lugares(index, filter_query):
+    return sorted(index.columns['place'][index.filter(filter_query)])
+
+
+def test_contains_keeps_value_as_text():
+    assert split_filter_part('{place} contains 5') == ('place', 'contains', '5')
+    assert split_filter_part('{mag} >= 2.5') == ('mag', 'ge', 2.5)
+
+
+def test_contains_number_on_text_column(index):
+    assert lugares(index, '{place} contains 5') == ['15 km E of Anza, CA', '5 km NE of The Geysers, CA']
+
+
+def test_contains_on_mag(index):
+    assert lugares(index, '{mag} contains 1') == ['15 km E of Anza, CA', '5 km NE of The Geysers, CA']
+
+
+def test_mag_comparisons(index):
+    assert lugares(index, '{mag} >= 2.3') == ['129 km SSW of Tual, Indonesia', '8 km S of Volcano, Hawaii']
+    assert lugares(index, '{mag} < 1.8') == ['15 km E of Anza, CA']
+    assert lugares(index, '{mag} >= 1.5 && {place} contains CA') == ['5 km NE of The Geysers, CA']
+
+
+@pytest.mark.parametrize('filter_query', ['{place} > 5', '{mag} > abc', '{place} <= 3 && {mag} >= 1'])
+def test_mismatched_comparison_matches_nothing(index, filter_query):
+    assert lugares(index, filter_query) == []
@@ -0,0 +1,35 @@
+"""
+Workers de la app de sismos en procesos separados contra el stub de la
+USGS (benchmarks/bench_workers.py), como bajo gunicorn con ``-w N``.
+"""
+import os
+import sys
+
+import pytest
+
+from conftest import RAIZ
+
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+from bench_workers import RONDAS, correr  # noqa: E402
+from stub_usgs import StubUSGS  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with StubUSGS(n=2000, latencia=0.05) as stub:
+        yield stub
+
+
+@pytest.mark.parametrize('n_workers', [1, 4])
+def test_shared_store_fetches_and_parses_once_per_round(stub, n_workers):
+    filas = correr(stub, n_workers, compartido=True)
+
+    assert [ronda for ronda, *_ in filas] == list(RONDAS)
+    for ronda, requests, parseos, _ in filas:
+        assert (requests, parseos) == (1, 1), ronda
+
+
+def test_without_shared_store_every_worker_fetches(stub):
+    for ronda, requests, parseos, _ in correr(stub, 2, compartido=False):
+        assert (requests, parseos) == (2, 2), ronda